@@ -1,7 +1,11 @@
 import socket
-from datetime import datetime
 import json
 import sys
+import threading
+from IPC.async_log import get_logger
+from IPC.peer_link import LINK_MAGIC, serve_link
+
+log = get_logger("TCP")
 
 
 def main(node):
@@ -9,42 +13,65 @@ def main(node):
         server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         server_socket.bind((node.host, node.port))
         server_socket.listen(3)
-        print(f"Server listening on {node.host}:{node.port}...", flush=True)
+        log.info(f"Server listening on {node.host}:{node.port}...")
 
         while True:
             try:
                 conn, addr = server_socket.accept()
-                print(f"[TCP] Connected by {addr}", flush=True)
+                log.debug("connected", addr=addr)
                 with conn:
-                    while True:
+                    data = conn.recv(1024)
+                    if data.startswith(LINK_MAGIC):
+                        # Long-lived batched link: hand the socket to its own thread
+                        link = socket.socket(fileno=conn.detach())
+                        threading.Thread(
+                            target=_serve_link, args=(node, link, data[len(LINK_MAGIC):], addr), daemon=True
+                        ).start()
+                        continue
+                    while data:
+                        reply = handle_message(node, data.decode("utf-8"), addr[0])
+                        conn.sendall(reply.encode("utf-8"))
                         data = conn.recv(1024)
-                        if not data:
-                            break
-                        text = data.decode("utf-8").strip()
-                        LC_timestamp, text = text.split('|', 1)
-                        if text.startswith("{") or text.startswith("["):
-                            pretty_print(text)
-                        else:
-                            print(f"TCP Direct Message: {text}\n", flush=True)
-                        conn.sendall("Message Delivered.".encode("utf-8"))
-                        timestamp = datetime.now().strftime("%H:%M:%S")
-                        print(
-                            f"[{timestamp}] Message logged from {addr[0]}\n", flush=True
-                        )
-                        node.clock.update(int(LC_timestamp))
-                        print(f'LCRTime: {node.clock.now()}')
             except Exception as e:
-                print(f"[ERROR] {e}", flush=True)
+                log.error("connection failed", error=e)
+
+
+def _serve_link(node, conn, initial, addr):
+    def handle(message):
+        try:
+            handle_message(node, message, addr[0])
+        except Exception as e:
+            log.error("bad message on link", rate=5, sender=addr[0], error=e)
+
+    try:
+        serve_link(conn, initial, handle)
+    except Exception as e:
+        log.error("link failed", sender=addr[0], error=e)
+
+
+def handle_message(node, raw, sender):
+    """
+    Display one "<lamport_ts>|<text>" message, merge its clock and return the ack.
+    Gossip frames (see Node.on_gossip) are handed to the node for dedup/relay.
+    """
+    raw = raw.strip()
+    if raw[:2] in ("G|", "D|"):
+        return node.on_gossip(raw, sender)
+    LC_timestamp, text = raw.split('|', 1)
+    if text.startswith("{") or text.startswith("["):
+        pretty_print(text)
+    else:
+        log.info(f"TCP Direct Message: {text}")
+    node.clock.update(int(LC_timestamp))
+    log.info("message logged", sender=sender, lc_recv=node.clock.now())
+    return "Message Delivered."
 
 
 def pretty_print(data):
     try:
         parsed = json.loads(data)
-        print(
-            f"[MESSAGE SERVER] From {parsed.get('sender', 'Unknown')}: {parsed.get('content', data)}\n",
-            flush=True,
-        )
+        log.info(f"[MESSAGE SERVER] From {parsed.get('sender', 'Unknown')}: {parsed.get('content', data)}")
     except Exception:
-        print(f"[RAW MESSAGE] {data}\n", flush=True)
+        log.info(f"[RAW MESSAGE] {data}")
 
 
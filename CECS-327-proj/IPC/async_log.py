@@ -0,0 +1,169 @@
+import atexit
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+_LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARN", ERROR: "ERROR"}
+_LEVELS = {"DEBUG": DEBUG, "INFO": INFO, "WARNING": WARNING, "WARN": WARNING, "ERROR": ERROR}
+
+LOG_LEVEL = _LEVELS.get(os.environ.get("LOG_LEVEL", "INFO").upper(), INFO)
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "text")  # "text" or "json"
+
+# SimpleQueue is implemented in C and never blocks on put()
+_queue: "queue.SimpleQueue[Optional[Dict[str, Any]]]" = queue.SimpleQueue()
+_writer: Optional[threading.Thread] = None
+_writer_lock = threading.Lock()
+
+
+def _format(record: Dict[str, Any]) -> str:
+    if LOG_FORMAT == "json":
+        return json.dumps(record, default=str)
+
+    ts = datetime.fromtimestamp(record["ts"]).strftime("%H:%M:%S.%f")[:-3]
+    line = f"{ts} {record['level']:<5} [{record['logger']}] {record['msg']}"
+    fields = record.get("fields")
+    if fields:
+        line += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+    return line
+
+
+def _write_loop() -> None:
+    while True:
+        record = _queue.get()
+        # Looked up per batch: sys.stdout may be replaced (tests, daemons)
+        out = sys.stdout
+        if record is None:
+            out.flush()
+            return
+        out.write(_format(record) + "\n")
+        # Drain whatever is already queued, then flush once per batch
+        while True:
+            try:
+                record = _queue.get_nowait()
+            except queue.Empty:
+                break
+            if record is None:
+                out.flush()
+                return
+            out.write(_format(record) + "\n")
+        out.flush()
+
+
+def _ensure_writer() -> None:
+    global _writer
+    if _writer is not None:
+        return
+    with _writer_lock:
+        if _writer is None:
+            _writer = threading.Thread(target=_write_loop, name="async-log-writer", daemon=True)
+            _writer.start()
+
+
+def shutdown(timeout: float = 2.0) -> None:
+    """
+    Flush pending records and stop the background writer.
+    """
+    global _writer
+    if _writer is None:
+        return
+    _queue.put(None)
+    _writer.join(timeout)
+    _writer = None
+
+
+atexit.register(shutdown)
+
+
+class _RateLimit:
+    def __init__(self, per_second: float) -> None:
+        self.per_second = per_second
+        self.window_start = 0.0
+        self.emitted = 0
+        self.suppressed = 0
+
+
+class Logger:
+    """
+    Leveled, structured logger. Records are handed to a background writer
+    thread so callers never block on stdout.
+
+    High-frequency call sites can pass `sample=N` to keep one record in N,
+    or `rate=R` to emit at most R records per second for that message;
+    the number of dropped records is attached to the next one emitted.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name = name
+        self._samples: Dict[str, int] = {}
+        self._rates: Dict[str, _RateLimit] = {}
+
+    def is_enabled(self, level: int) -> bool:
+        return level >= LOG_LEVEL
+
+    def log(self, level: int, msg: str, sample: int = 1, rate: Optional[float] = None, **fields: Any) -> None:
+        if level < LOG_LEVEL:
+            return
+
+        if sample > 1:
+            # Counters are racy across threads; that only skews the sample slightly
+            n = self._samples.get(msg, 0)
+            self._samples[msg] = n + 1
+            if n % sample:
+                return
+
+        if rate is not None:
+            limit = self._rates.get(msg)
+            if limit is None:
+                limit = self._rates.setdefault(msg, _RateLimit(rate))
+            now = time.monotonic()
+            if now - limit.window_start >= 1.0:
+                limit.window_start = now
+                limit.emitted = 0
+            if limit.emitted >= limit.per_second:
+                limit.suppressed += 1
+                return
+            limit.emitted += 1
+            if limit.suppressed:
+                fields["suppressed"] = limit.suppressed
+                limit.suppressed = 0
+
+        _ensure_writer()
+        _queue.put({
+            "ts": time.time(),
+            "level": _LEVEL_NAMES.get(level, str(level)),
+            "logger": self.name,
+            "msg": msg,
+            "fields": fields,
+        })
+
+    def debug(self, msg: str, **kwargs: Any) -> None:
+        self.log(DEBUG, msg, **kwargs)
+
+    def info(self, msg: str, **kwargs: Any) -> None:
+        self.log(INFO, msg, **kwargs)
+
+    def warning(self, msg: str, **kwargs: Any) -> None:
+        self.log(WARNING, msg, **kwargs)
+
+    def error(self, msg: str, **kwargs: Any) -> None:
+        self.log(ERROR, msg, **kwargs)
+
+
+_loggers: Dict[str, Logger] = {}
+
+
+def get_logger(name: str) -> Logger:
+    logger = _loggers.get(name)
+    if logger is None:
+        logger = _loggers.setdefault(name, Logger(name))
+    return logger
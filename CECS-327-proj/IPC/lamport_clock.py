@@ -1,7 +1,8 @@
 import threading
 
 class LamportClock:
-    def __init__(self):
+    def __init__(self, node_id=None):
+        self.node_id = node_id
         self._time = 0
         self._lock = threading.Lock()
 
@@ -0,0 +1,183 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Optional, Tuple
+
+# Latency bucket upper bounds in seconds (last bucket is +Inf)
+DEFAULT_BUCKETS = (
+    0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+
+# Per-transaction trace spans are off unless TRACE_TX=1
+TRACE_ENABLED = os.environ.get("TRACE_TX", "0") == "1"
+TRACE_BUFFER = int(os.environ.get("TRACE_BUFFER", "1000"))
+
+
+class Counter:
+    def __init__(self) -> None:
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int = 1) -> None:
+        with self._lock:
+            self._value += amount
+
+    def snapshot(self) -> int:
+        return self._value
+
+
+class Gauge:
+    def __init__(self) -> None:
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int = 1) -> None:
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: int = 1) -> None:
+        with self._lock:
+            self._value -= amount
+
+    def set(self, value: int) -> None:
+        self._value = value
+
+    def snapshot(self) -> int:
+        return self._value
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> None:
+        self._bounds = buckets
+        self._counts = [0] * (len(buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        idx = bisect_left(self._bounds, value)
+        with self._lock:
+            self._counts[idx] += 1
+            self._sum += value
+            self._count += 1
+            if value > self._max:
+                self._max = value
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            counts = list(self._counts)
+            total, count, max_value = self._sum, self._count, self._max
+
+        buckets = {}
+        running = 0
+        for bound, c in zip(self._bounds, counts):
+            running += c
+            buckets[str(bound)] = running
+        buckets["+Inf"] = running + counts[-1]
+
+        return {
+            "count": count,
+            "sum": total,
+            "avg": total / count if count else 0.0,
+            "max": max_value,
+            "buckets": buckets,
+        }
+
+
+class MetricsRegistry:
+    """
+    Process-wide collection of named counters, gauges and histograms.
+    Metrics can carry a single label (e.g. a peer URL) so per-peer
+    latencies are tracked separately.
+    """
+
+    def __init__(self) -> None:
+        self._metrics: Dict[Tuple[str, Optional[str]], Any] = {}
+        self._lock = threading.Lock()
+        self._spans: deque = deque(maxlen=TRACE_BUFFER)
+
+    def _get(self, kind, name: str, label: Optional[str]):
+        key = (name, label)
+        metric = self._metrics.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(key)
+                if metric is None:
+                    metric = kind()
+                    self._metrics[key] = metric
+        return metric
+
+    def counter(self, name: str, label: Optional[str] = None) -> Counter:
+        return self._get(Counter, name, label)
+
+    def gauge(self, name: str, label: Optional[str] = None) -> Gauge:
+        return self._get(Gauge, name, label)
+
+    def histogram(self, name: str, label: Optional[str] = None) -> Histogram:
+        return self._get(Histogram, name, label)
+
+    @contextmanager
+    def span(self, name: str, tx_id: str, **attrs):
+        """
+        Record a trace span for a transaction. No-op unless tracing is enabled.
+        """
+        if not TRACE_ENABLED:
+            yield
+            return
+
+        t0 = time.perf_counter()
+        error = None
+        try:
+            yield
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            self.record_span(name, tx_id, time.perf_counter() - t0, error=error, **attrs)
+
+    def record_span(self, name: str, tx_id: str, duration: float, **attrs) -> None:
+        if not TRACE_ENABLED:
+            return
+        self._spans.append({
+            "name": name,
+            "tx_id": tx_id,
+            "end": time.time(),
+            "duration": duration,
+            **attrs,
+        })
+
+    def spans(self, tx_id: Optional[str] = None) -> list:
+        spans = list(self._spans)
+        if tx_id is not None:
+            spans = [s for s in spans if s["tx_id"] == tx_id]
+        return spans
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            items = list(self._metrics.items())
+
+        out: Dict[str, Any] = {}
+        for (name, label), metric in sorted(items, key=lambda kv: (kv[0][0], kv[0][1] or "")):
+            value = metric.snapshot()
+            if label is None:
+                out[name] = value
+            else:
+                out.setdefault(name, {})[label] = value
+        return out
+
+
+# One registry per process (GLOBAL SINGLETON)
+registry = MetricsRegistry()
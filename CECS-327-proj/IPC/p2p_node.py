@@ -1,19 +1,60 @@
+import os
 import sys
+import queue
+import random
+import socket
+import itertools
 import threading
 import subprocess
-from TCPServer import main as run_server
+from collections import OrderedDict
 from pathlib import Path
-from lamport_clock import LamportClock
+
+if not __package__:
+    # Run as `python IPC/p2p_node.py`: make the project packages importable
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from IPC.TCPServer import main as run_server, handle_message
+from IPC.lamport_clock import LamportClock
+from IPC.async_log import get_logger
+from IPC.peer_link import PEER_BATCHING, get_link
 import time
-import httpx
+
+log = get_logger("Node")
+
+# "mesh": sender unicasts to every peer. "gossip": sender and every first-time
+# receiver forward to GOSSIP_FANOUT random peers, so per-node cost stays flat.
+P2P_MODE = os.environ.get("P2P_MODE", "mesh")
+GOSSIP_FANOUT = int(os.environ.get("GOSSIP_FANOUT", "3"))
+ANTI_ENTROPY_INTERVAL = float(os.environ.get("ANTI_ENTROPY_INTERVAL", "5.0"))
+SEEN_LIMIT = 10000      # messages kept for repair
+DIGEST_BYTES = 900      # digest entries per frame; keeps a frame under the 1024-byte recv
+REPAIR_LIMIT = 256      # frames pushed back per digest; the rest follow next round
 
 class Node:
-    def __init__(self, node_id, peers=None, host="127.0.0.1", base_port=7896):
+    def __init__(self, node_id, peers=None, host="127.0.0.1", base_port=7896,
+                 mode=P2P_MODE, fanout=GOSSIP_FANOUT, batching=PEER_BATCHING):
         self.node_id = node_id
         self.host = host
         self.port = base_port + int(node_id)
+        self.address = f"{host}:{self.port}"
         self.peers = peers or []
         self.clock = LamportClock()
+        self.mode = mode
+        self.fanout = fanout
+        # Coalesce sends per peer over a persistent link instead of one
+        # connection (and one TCPClient process) per message
+        self.batching = batching
+        self.rng = random.Random()
+        # msg_id -> "<ts>|<text>", oldest first
+        self.seen = OrderedDict()
+        # origin ("<node_id>.<epoch>") -> [highest contiguous seq, seqs seen past it]
+        self.progress = {}
+        self._seen_lock = threading.Lock()
+        # Random per-process epoch: after a restart the sequence starts over,
+        # and peers still remember the old ids
+        self._epoch = os.urandom(3).hex()
+        self._msg_seq = itertools.count(1)
+        self._outbox = queue.SimpleQueue()
 
     def start_server_thread(self):
         print(f"[Node {self.node_id}] Starting server on port {self.port}")
@@ -21,24 +62,16 @@ class Node:
             target=run_server, args=(self,), daemon=True
         )
         process.start()
+        if self.mode == "gossip":
+            if not self.batching:
+                threading.Thread(target=self._send_loop, daemon=True).start()
+            threading.Thread(target=self._anti_entropy_loop, daemon=True).start()
 
     def send_test_message(self):
-        
-        BASE_DIR = Path(__file__).resolve().parent
-        file_path = BASE_DIR / "TCPClient.py"
-
         message = input(f"[Node {self.node_id}] Enter message (blank to skip): ")
         message = f'{str(self.clock.now())}|{message}'
-
-        tx_id = f"{self.node_id}-{int(time.time() * 1000)}"
-        key = "messages"   # or "chat-log", or one key per channel
-        value = message
-
-        payload = {
-            "tx_id": tx_id,
-            "key": key,
-            "value": value,
-        }
+        payload = self.tx_payload(message)
+        tx_id = payload["tx_id"]
 
         # This node is the leader → it calls /start on *itself*
         coord_port = 8000 + int(self.node_id) - 1
@@ -46,6 +79,7 @@ class Node:
 
         print(f"[Node {self.node_id}] Starting 2PC tx={tx_id}")
         try:
+            import httpx  # only the interactive send path needs it
             r = httpx.post(coord_url, json=payload, timeout=5.0)
             r.raise_for_status()
             result = r.json()
@@ -62,16 +96,166 @@ class Node:
         
         if not message.strip():
             return
+        self.broadcast(message)
+
+    def tx_payload(self, message):
+        tx_id = f"{self.node_id}-{int(time.time() * 1000)}"
+        key = "messages"   # or "chat-log", or one key per channel
+        return {
+            "tx_id": tx_id,
+            "key": key,
+            "value": message,
+        }
+
+    def broadcast(self, message):
+        if self.mode == "gossip":
+            self.gossip(message)
+            return
         for peer in self.peers:
-            host, port = peer.split(":")
-            print(f"[Node {self.node_id}] Sending to {peer}")
-            print(message,host,port)
-            subprocess.run(
-                [sys.executable, file_path, message, host, port], check=True
-            )
-            print(f"[Node {self.node_id}] Message sent to {peer}")
+            self.send_to_peer(peer, message)
+            log.debug("message sent", node=self.node_id, peer=peer)
         self.clock.tick()
-        print(f'LCStime: {self.clock.now()}')
+        log.debug("LCStime", node=self.node_id, lc_send=self.clock.now())
+
+    def send_to_peer(self, peer, message):
+        if self.batching:
+            get_link(peer).send(message)
+            return
+        file_path = Path(__file__).resolve().parent / "TCPClient.py"
+        host, port = peer.split(":")
+        subprocess.run(
+            [sys.executable, file_path, message, host, port], check=True
+        )
+
+    # -----------------------------
+    # Gossip
+    # -----------------------------
+    # Frames share the TCP message channel with plain "<ts>|<text>" messages:
+    #   G|<msg_id>|<via>|<ts>|<text>  data, forwarded once by each node;
+    #                               <via> is the relaying node's host:port
+    #   D|<reply_to>|<after>|<upto>|<origin:seq,...>
+    #                               anti-entropy digest: for every origin in
+    #                               (after, upto], the highest contiguous seq the
+    #                               sender has ("" bounds are open). The receiver
+    #                               pushes back every newer message it holds.
+    def gossip(self, message):
+        msg_id = f"{self.node_id}.{self._epoch}.{next(self._msg_seq)}"
+        self._remember(msg_id, message)
+        self._forward(msg_id, message, exclude=None)
+        self.clock.tick()
+        log.debug("LCStime", node=self.node_id, lc_send=self.clock.now())
+
+    def _remember(self, msg_id, message):
+        origin, seq = msg_id.rsplit(".", 1)
+        seq = int(seq)
+        with self._seen_lock:
+            # Progress outlives `seen`, so even evicted messages stay deduplicated
+            progress = self.progress.setdefault(origin, [0, set()])
+            if seq <= progress[0] or seq in progress[1]:
+                return False
+            progress[1].add(seq)
+            while progress[0] + 1 in progress[1]:
+                progress[0] += 1
+                progress[1].discard(progress[0])
+
+            self.seen[msg_id] = message
+            if len(self.seen) > SEEN_LIMIT:
+                self.seen.popitem(last=False)
+            return True
+
+    def _frame(self, msg_id, message):
+        return f"G|{msg_id}|{self.address}|{message}"
+
+    def _forward(self, msg_id, message, exclude):
+        frame = self._frame(msg_id, message)
+        candidates = [p for p in self.peers if p != exclude]
+        for peer in self.rng.sample(candidates, min(self.fanout, len(candidates))):
+            self.queue_send(peer, frame)
+
+    def on_gossip(self, raw, sender):
+        kind, rest = raw.split("|", 1)
+        if kind == "G":
+            msg_id, via, message = rest.split("|", 2)
+            if self._remember(msg_id, message):
+                handle_message(self, message, sender)
+                # Don't send it straight back to the node we got it from
+                self._forward(msg_id, message, exclude=via)
+        elif kind == "D":
+            reply_to, after, upto, entries = rest.split("|", 3)
+            theirs = {}
+            for entry in entries.split(","):
+                if entry:
+                    origin, contiguous = entry.rsplit(":", 1)
+                    theirs[origin] = int(contiguous)
+            for frame in self._repair_frames(theirs, after, upto):
+                self.queue_send(reply_to, frame)
+        return "Message Delivered."
+
+    def _repair_frames(self, theirs, after, upto):
+        frames = []
+        with self._seen_lock:
+            for origin, (contiguous, ahead) in sorted(self.progress.items()):
+                if origin <= after or (upto and origin > upto):
+                    continue
+                top = max(ahead) if ahead else contiguous
+                for seq in range(theirs.get(origin, 0) + 1, top + 1):
+                    msg_id = f"{origin}.{seq}"
+                    if msg_id in self.seen:
+                        frames.append(self._frame(msg_id, self.seen[msg_id]))
+                        if len(frames) >= REPAIR_LIMIT:
+                            return frames
+        return frames
+
+    def digest_frames(self):
+        """
+        This node's full progress as one or more D frames, each covering a
+        contiguous range of origins.
+        """
+        with self._seen_lock:
+            entries = [(origin, p[0]) for origin, p in sorted(self.progress.items())]
+
+        frames = []
+        after, chunk, size = "", [], 0
+        for origin, contiguous in entries:
+            entry = f"{origin}:{contiguous}"
+            if chunk and size + len(entry) > DIGEST_BYTES:
+                upto = chunk[-1].rsplit(":", 1)[0]
+                frames.append(f"D|{self.address}|{after}|{upto}|{','.join(chunk)}")
+                after, chunk, size = upto, [], 0
+            chunk.append(entry)
+            size += len(entry) + 1
+        frames.append(f"D|{self.address}|{after}||{','.join(chunk)}")
+        return frames
+
+    def anti_entropy_round(self):
+        if not self.peers:
+            return
+        peer = self.rng.choice(self.peers)
+        for frame in self.digest_frames():
+            self.queue_send(peer, frame)
+
+    def queue_send(self, peer, frame):
+        # Sent from a separate thread so the server loop never blocks on a peer
+        if self.batching:
+            get_link(peer).send(frame)
+        else:
+            self._outbox.put((peer, frame))
+
+    def _send_loop(self):
+        while True:
+            peer, frame = self._outbox.get()
+            host, port = peer.split(":")
+            try:
+                with socket.create_connection((host, int(port)), timeout=3.0) as s:
+                    s.sendall(frame.encode("utf-8"))
+                    s.recv(1024)
+            except OSError as e:
+                log.warning("gossip send failed", rate=5, peer=peer, error=e)
+
+    def _anti_entropy_loop(self):
+        while True:
+            time.sleep(ANTI_ENTROPY_INTERVAL)
+            self.anti_entropy_round()
 
     def run(self):
         self.start_server_thread()
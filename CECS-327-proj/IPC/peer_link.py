@@ -0,0 +1,295 @@
+import json
+import os
+import socket
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+from IPC.metrics import registry as metrics
+from IPC.async_log import get_logger
+
+log = get_logger("LINK")
+
+# Batched peer links are opt-in: PEER_BATCHING=1
+PEER_BATCHING = os.environ.get("PEER_BATCHING", "0") == "1"
+LINK_WINDOW = float(os.environ.get("LINK_WINDOW_MS", "5")) / 1000
+LINK_MAX_BYTES = int(os.environ.get("LINK_MAX_BYTES", str(64 * 1024)))
+LINK_COMPRESS_THRESHOLD = int(os.environ.get("LINK_COMPRESS_THRESHOLD", "1024"))
+
+# A link connection opens with LINK_MAGIC, which can never start a plain
+# "<ts>|<text>" message, followed by the sender's random 8-byte link id.
+# After that, each batch is
+#   flags (1 byte, bit 0 = zlib) | first seq (8 bytes) | length (4 bytes) | JSON list
+# where messages are numbered per link from 1. The receiver answers each
+# batch with one cumulative ack: the highest seq it has handled for that
+# link (8 bytes). It remembers that seq across connections and skips
+# anything at or below it, so a batch resent after a lost ack is not
+# handled twice.
+LINK_MAGIC = b"\x00PL1"
+_LINK_ID = struct.Struct(">Q")
+_BATCH_HEADER = struct.Struct(">BQI")
+_ACK = struct.Struct(">Q")
+_FLAG_ZLIB = 0x01
+_MAX_FRAME = 16 * 1024 * 1024
+_MAX_LINKS = 4096  # sender link ids remembered for dedup
+
+
+def _recv_exact(sock: socket.socket, n: int, buf: bytearray) -> Optional[bytes]:
+    while len(buf) < n:
+        chunk = sock.recv(max(4096, n - len(buf)))
+        if not chunk:
+            return None
+        buf += chunk
+    data = bytes(buf[:n])
+    del buf[:n]
+    return data
+
+
+class PeerLink:
+    """
+    Persistent connection to one peer that coalesces outbound messages.
+
+    send() only queues; a flusher thread writes everything queued within
+    `window` seconds (or as soon as `max_bytes` is reached) as one batch,
+    zlib-compressed when it exceeds `compress_threshold`, and waits for a
+    single ack. A batch that still fails after one reconnect is dropped,
+    counted and logged; like a one-shot TCPClient send, the failure never
+    reaches the caller. A resent batch is deduplicated by the receiver
+    while that process stays up.
+    """
+
+    def __init__(
+        self,
+        address: Tuple[str, int],
+        window: float = LINK_WINDOW,
+        max_bytes: int = LINK_MAX_BYTES,
+        compress_threshold: int = LINK_COMPRESS_THRESHOLD,
+    ) -> None:
+        self.address = address
+        self.peer = f"{address[0]}:{address[1]}"
+        self.window = window
+        self.max_bytes = max_bytes
+        self.compress_threshold = compress_threshold
+        self.batches = 0
+        self.messages = 0
+        self.dropped = 0
+
+        self._pending: List[str] = []
+        self._pending_bytes = 0
+        self._in_flight = 0
+        self._cond = threading.Condition()
+        self._sock: Optional[socket.socket] = None
+        self._link_id = int.from_bytes(os.urandom(_LINK_ID.size), "big")
+        self._next_seq = 1
+        self._acked = 0
+        self._thread = threading.Thread(target=self._run, name=f"peer-link-{self.peer}", daemon=True)
+        self._thread.start()
+
+    def send(self, message: str) -> None:
+        with self._cond:
+            self._pending.append(message)
+            self._pending_bytes += len(message)
+            if len(self._pending) == 1 or self._pending_bytes >= self.max_bytes:
+                self._cond.notify_all()
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """
+        Block until everything queued so far has been acked (or dropped).
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            self._cond.notify_all()
+            while self._pending or self._in_flight:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                # Micro-window: let a burst accumulate unless the byte budget is hit
+                deadline = time.monotonic() + self.window
+                while self._pending_bytes < self.max_bytes:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                batch, self._pending = self._pending, []
+                self._pending_bytes = 0
+                self._in_flight = len(batch)
+
+            start = time.perf_counter()
+            try:
+                self._write_batch(batch)
+            except Exception as e:
+                self.dropped += len(batch)
+                metrics.counter("peer_link_dropped_total", self.peer).inc(len(batch))
+                log.warning("batch dropped", rate=5, peer=self.peer, messages=len(batch), error=e)
+            else:
+                # Send latency: batch write until the peer's ack
+                metrics.histogram("tcp_send_seconds", self.peer).observe(time.perf_counter() - start)
+
+            with self._cond:
+                self._in_flight = 0
+                self._cond.notify_all()
+
+    def _connect(self) -> socket.socket:
+        sock = socket.create_connection(self.address, timeout=5.0)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.sendall(LINK_MAGIC + _LINK_ID.pack(self._link_id))
+        return sock
+
+    def _write_batch(self, batch: List[str]) -> None:
+        body = json.dumps(batch, separators=(",", ":")).encode("utf-8")
+        flags = 0
+        if len(body) > self.compress_threshold:
+            body = zlib.compress(body, 1)
+            flags |= _FLAG_ZLIB
+        first = self._next_seq
+        self._next_seq += len(batch)
+        last = first + len(batch) - 1
+        frame = _BATCH_HEADER.pack(flags, first, len(body)) + body
+
+        for attempt in range(2):
+            try:
+                if self._sock is None:
+                    self._sock = self._connect()
+                self._sock.sendall(frame)
+                ack = _recv_exact(self._sock, _ACK.size, bytearray())
+                if ack is None:
+                    raise ConnectionError(f"peer {self.address} closed the link")
+                (acked,) = _ACK.unpack(ack)
+                if acked != last:
+                    raise ConnectionError(f"peer {self.address} acked {acked}, expected {last}")
+                self._acked = acked
+                break
+            except OSError:
+                if self._sock is not None:
+                    self._sock.close()
+                    self._sock = None
+                # Retry once on a fresh connection (the peer may have restarted)
+                if attempt:
+                    raise
+
+        self.batches += 1
+        self.messages += len(batch)
+
+
+_links: Dict[Tuple[str, int], PeerLink] = {}
+_links_lock = threading.Lock()
+
+
+def get_link(peer: str) -> PeerLink:
+    """
+    Shared link for a "host:port" peer, created on first use.
+    """
+    host, port = peer.rsplit(":", 1)
+    address = (host, int(port))
+    link = _links.get(address)
+    if link is None:
+        with _links_lock:
+            link = _links.get(address)
+            if link is None:
+                link = _links[address] = PeerLink(address)
+    return link
+
+
+def _decode_batch(flags: int, body: bytes) -> List[str]:
+    if flags & _FLAG_ZLIB:
+        body = zlib.decompress(body)
+    return json.loads(body)
+
+
+# link id -> highest seq handled, most recently used last
+_delivered: "OrderedDict[int, int]" = OrderedDict()
+_delivered_lock = threading.Lock()
+
+
+def _deliver(link_id: int, first: int, batch: List[str], handle: Callable[[str], object]) -> int:
+    """
+    Hand the batch's not-yet-handled messages to `handle`; return the ack.
+    """
+    with _delivered_lock:
+        done = _delivered.get(link_id, 0)
+    for seq, message in enumerate(batch, first):
+        if seq > done:
+            handle(message)
+            done = seq
+    with _delivered_lock:
+        _delivered[link_id] = done
+        _delivered.move_to_end(link_id)
+        if len(_delivered) > _MAX_LINKS:
+            _delivered.popitem(last=False)
+    return done
+
+
+def serve_link(conn: socket.socket, initial: bytes, handle: Callable[[str], object]) -> None:
+    """
+    Receive batches on a link connection (after LINK_MAGIC), hand each
+    new message to `handle`, and ack once per batch.
+    """
+    buf = bytearray(initial)
+    with conn:
+        header = _recv_exact(conn, _LINK_ID.size, buf)
+        if header is None:
+            return
+        (link_id,) = _LINK_ID.unpack(header)
+        while True:
+            header = _recv_exact(conn, _BATCH_HEADER.size, buf)
+            if header is None:
+                return
+            flags, first, length = _BATCH_HEADER.unpack(header)
+            if length > _MAX_FRAME:
+                raise ValueError(f"link frame of {length} bytes exceeds limit")
+            body = _recv_exact(conn, length, buf)
+            if body is None:
+                return
+
+            done = _deliver(link_id, first, _decode_batch(flags, body), handle)
+            conn.sendall(_ACK.pack(done))
+
+
+async def serve_link_async(reader, writer, initial: bytes, handle: Callable[[str], object]) -> None:
+    """
+    asyncio version of serve_link for stream reader/writer pairs.
+    """
+    buf = bytearray(initial)
+
+    async def read_exact(n: int) -> Optional[bytes]:
+        while len(buf) < n:
+            chunk = await reader.read(max(4096, n - len(buf)))
+            if not chunk:
+                return None
+            buf.extend(chunk)
+        data = bytes(buf[:n])
+        del buf[:n]
+        return data
+
+    try:
+        header = await read_exact(_LINK_ID.size)
+        if header is None:
+            return
+        (link_id,) = _LINK_ID.unpack(header)
+        while True:
+            header = await read_exact(_BATCH_HEADER.size)
+            if header is None:
+                return
+            flags, first, length = _BATCH_HEADER.unpack(header)
+            if length > _MAX_FRAME:
+                raise ValueError(f"link frame of {length} bytes exceeds limit")
+            body = await read_exact(length)
+            if body is None:
+                return
+
+            done = _deliver(link_id, first, _decode_batch(flags, body), handle)
+            writer.write(_ACK.pack(done))
+            await writer.drain()
+    finally:
+        writer.close()
@@ -0,0 +1,306 @@
+import itertools
+import math
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from IPC.transaction_manager import TransactionManager
+from IPC.metrics import registry as metrics
+from IPC.async_log import get_logger
+
+log = get_logger("RESERVE")
+
+DEFAULT_TTL = 300.0
+
+
+class ReservationConflict(RuntimeError):
+    pass
+
+
+class Lease:
+    def __init__(self, lease_id: str, station_id: str, vehicle_id: str, expires_at: float) -> None:
+        self.lease_id = lease_id
+        self.station_id = station_id
+        self.vehicle_id = vehicle_id
+        self.expires_at = expires_at
+        self.slot: Optional[int] = None  # timer wheel slot this lease is parked in
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "lease_id": self.lease_id,
+            "station_id": self.station_id,
+            "vehicle_id": self.vehicle_id,
+            "expires_at": self.expires_at,
+        }
+
+    def __repr__(self) -> str:
+        return f"<Lease {self.lease_id} {self.station_id}->{self.vehicle_id}>"
+
+
+class ReservationManager:
+    """
+    Lease-based station reservations on top of a TransactionManager.
+
+    Availability lives in an in-memory bitmap (bit i set = station i free),
+    so "find any free station" is a lowest-set-bit lookup instead of a probe
+    per key. Leases expire through a hashed timer wheel. Every grant and
+    release is still written to the TransactionManager as `station:<id>`
+    so the committed store stays the source of truth for other readers.
+
+    Store writes for one station are serialized and always write the
+    station's current holder, so a slow release can never land after the
+    grant that followed it.
+    """
+
+    def __init__(
+        self,
+        tx_manager: TransactionManager,
+        stations: Iterable[str] = (),
+        default_ttl: float = DEFAULT_TTL,
+        tick: float = 1.0,
+        wheel_size: int = 512,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.tx_manager = tx_manager
+        self.default_ttl = default_ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+
+        # Bitmap index: station_id <-> bit position
+        self._index: Dict[str, int] = {}
+        self._stations: List[str] = []
+        self._free = 0
+
+        # Per-station store write ordering: state version vs. last version written
+        self._version: Dict[str, int] = {}
+        self._written: Dict[str, int] = {}
+        self._write_locks: Dict[str, threading.Lock] = {}
+
+        self._leases: Dict[str, Lease] = {}       # lease_id -> Lease
+        self._by_station: Dict[str, Lease] = {}   # station_id -> Lease
+        self._lease_ids = itertools.count(1)
+
+        # Timer wheel
+        self._tick = tick
+        self._wheel: List[Set[str]] = [set() for _ in range(wheel_size)]
+        self._cursor = 0
+        self._wheel_time = clock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        self.register(stations)
+
+    # -----------------------------
+    # Station index
+    # -----------------------------
+    def register(self, station_ids: Iterable[str]) -> None:
+        with self._lock:
+            for station_id in station_ids:
+                self._register_locked(station_id)
+
+    def _register_locked(self, station_id: str) -> int:
+        bit = self._index.get(station_id)
+        if bit is None:
+            bit = len(self._stations)
+            self._index[station_id] = bit
+            self._stations.append(station_id)
+            self._free |= 1 << bit
+            self._version[station_id] = 0
+            self._written[station_id] = 0
+            self._write_locks[station_id] = threading.Lock()
+        return bit
+
+    def available(self, station_ids: Optional[Iterable[str]] = None) -> List[str]:
+        with self._lock:
+            free = self._free
+            if station_ids is None:
+                result = []
+                while free:
+                    low = free & -free
+                    result.append(self._stations[low.bit_length() - 1])
+                    free ^= low
+                return result
+            return [
+                s for s in station_ids
+                if s in self._index and free >> self._index[s] & 1
+            ]
+
+    # -----------------------------
+    # Leases
+    # -----------------------------
+    def reserve(self, station_id: str, vehicle_id: str, ttl: Optional[float] = None) -> Lease:
+        with self._lock:
+            bit = self._register_locked(station_id)
+            if not self._free >> bit & 1:
+                holder = self._by_station[station_id].vehicle_id
+                metrics.counter("reservation_conflicts_total").inc()
+                raise ReservationConflict(f"Station {station_id} already reserved by {holder}")
+            lease = self._grant_locked(station_id, bit, vehicle_id, ttl)
+
+        self._persist(lease, station_id, vehicle_id)
+        return lease
+
+    def reserve_any(self, vehicle_id: str, ttl: Optional[float] = None) -> Lease:
+        with self._lock:
+            if not self._free:
+                metrics.counter("reservation_conflicts_total").inc()
+                raise ReservationConflict("No free stations")
+            bit = (self._free & -self._free).bit_length() - 1
+            station_id = self._stations[bit]
+            lease = self._grant_locked(station_id, bit, vehicle_id, ttl)
+
+        self._persist(lease, station_id, vehicle_id)
+        return lease
+
+    def renew(self, lease_id: str, ttl: Optional[float] = None) -> Lease:
+        with self._lock:
+            lease = self._leases.get(lease_id)
+            if lease is None:
+                raise KeyError(f"Unknown or expired lease {lease_id}")
+            lease.expires_at = self._clock() + self._ttl(ttl)
+            self._schedule_locked(lease)
+            metrics.counter("reservation_renewals_total").inc()
+            return lease
+
+    def release(self, lease_id: str) -> Lease:
+        with self._lock:
+            lease = self._leases.get(lease_id)
+            if lease is None:
+                raise KeyError(f"Unknown or expired lease {lease_id}")
+            self._drop_locked(lease)
+
+        self._sync_station(lease.station_id)
+        metrics.counter("reservation_releases_total").inc()
+        return lease
+
+    def get_lease(self, lease_id: str) -> Optional[Lease]:
+        return self._leases.get(lease_id)
+
+    def _ttl(self, ttl: Optional[float]) -> float:
+        ttl = self.default_ttl if ttl is None else ttl
+        if ttl <= 0:
+            raise ValueError(f"ttl must be positive, got {ttl}")
+        return ttl
+
+    def _grant_locked(self, station_id: str, bit: int, vehicle_id: str, ttl: Optional[float]) -> Lease:
+        lease = Lease(
+            f"lease-{next(self._lease_ids)}",
+            station_id,
+            vehicle_id,
+            self._clock() + self._ttl(ttl),
+        )
+        self._free &= ~(1 << bit)
+        self._version[station_id] += 1
+        self._leases[lease.lease_id] = lease
+        self._by_station[station_id] = lease
+        self._schedule_locked(lease)
+        return lease
+
+    def _drop_locked(self, lease: Lease) -> None:
+        self._leases.pop(lease.lease_id, None)
+        if self._by_station.get(lease.station_id) is lease:
+            del self._by_station[lease.station_id]
+            self._free |= 1 << self._index[lease.station_id]
+            self._version[lease.station_id] += 1
+        if lease.slot is not None:
+            self._wheel[lease.slot].discard(lease.lease_id)
+            lease.slot = None
+
+    def _persist(self, lease: Lease, station_id: str, vehicle_id: str) -> None:
+        try:
+            self._sync_station(station_id)
+        except Exception:
+            # Store rejected the write (e.g. wait-die against a direct transaction)
+            with self._lock:
+                self._drop_locked(lease)
+            raise
+        metrics.counter("reservations_granted_total").inc()
+
+    def _sync_station(self, station_id: str) -> None:
+        """
+        Bring `station:<id>` up to date with the lease table. Writers for a
+        station queue on its write lock and each writes the holder as of
+        when it gets there, so the last write always reflects the latest
+        grant or release; a writer that finds its change already written
+        by a later one skips the store entirely.
+        """
+        with self._write_locks[station_id]:
+            with self._lock:
+                version = self._version[station_id]
+                if version == self._written[station_id]:
+                    return
+                lease = self._by_station.get(station_id)
+                value = lease.vehicle_id if lease is not None else None
+            self._write_station(station_id, value)
+            with self._lock:
+                self._written[station_id] = version
+
+    def _write_station(self, station_id: str, value: Optional[str]) -> None:
+        # Blind write: the bitmap already decided ownership, so there is no
+        # S-lock read and no lock upgrade on the hot station key.
+        tx_id = self.tx_manager.begin()
+        try:
+            self.tx_manager.write(tx_id, f"station:{station_id}", value)
+            self.tx_manager.commit(tx_id)
+        except Exception:
+            self.tx_manager.abort(tx_id)
+            raise
+
+    # -----------------------------
+    # Timer wheel
+    # -----------------------------
+    def _schedule_locked(self, lease: Lease) -> None:
+        if lease.slot is not None:
+            self._wheel[lease.slot].discard(lease.lease_id)
+        ticks = max(1, math.ceil((lease.expires_at - self._wheel_time) / self._tick))
+        # Leases further out than one rotation are re-parked when their slot comes up
+        ticks = min(ticks, len(self._wheel) - 1)
+        lease.slot = (self._cursor + ticks) % len(self._wheel)
+        self._wheel[lease.slot].add(lease.lease_id)
+
+    def expire_due(self) -> List[Lease]:
+        """
+        Advance the wheel to the current time and expire due leases.
+        Called by the background thread; callable directly for tests.
+        """
+        now = self._clock()
+        expired = []
+        with self._lock:
+            while self._wheel_time + self._tick <= now:
+                self._wheel_time += self._tick
+                self._cursor = (self._cursor + 1) % len(self._wheel)
+                bucket = self._wheel[self._cursor]
+                self._wheel[self._cursor] = set()
+                for lease_id in bucket:
+                    lease = self._leases.get(lease_id)
+                    if lease is None:
+                        continue
+                    lease.slot = None
+                    if lease.expires_at <= now:
+                        self._drop_locked(lease)
+                        expired.append(lease)
+                    else:
+                        self._schedule_locked(lease)
+
+        for lease in expired:
+            try:
+                self._sync_station(lease.station_id)
+            except Exception as e:
+                log.error("expire write failed", lease=lease.lease_id, error=e)
+            log.debug("lease expired", lease=lease.lease_id, station=lease.station_id)
+        if expired:
+            metrics.counter("reservations_expired_total").inc(len(expired))
+        return expired
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="reservation-wheel", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self._tick):
+            self.expire_due()
@@ -1,7 +1,12 @@
 import threading
+import time
 from enum import Enum, auto
 from typing import Any, Dict, Optional, Set, Tuple
 from IPC.lamport_clock import LamportClock
+from IPC.metrics import registry as metrics
+from IPC.async_log import get_logger
+
+log = get_logger("TxManager")
 
 
 
@@ -51,11 +56,17 @@ class TransactionManager:
         self._lock = threading.RLock()
         self._replica_apply_callback = replica_apply_callback
 
-    def begin(self) -> str:
+    def begin(self, tx_id: Optional[str] = None, start_ts: Optional[int] = None) -> str:
+        # tx_id/start_ts let a partitioned deployment open the same transaction
+        # on several managers with one global wait-die timestamp.
         with self._lock:
-            ts = self.clock.tick()
-            tx_id = f"{self.node_id}-{ts}"
-            tx = Transaction(tx_id, start_ts=ts)
+            if start_ts is None:
+                start_ts = self.clock.tick()
+            else:
+                self.clock.update(start_ts)
+            if tx_id is None:
+                tx_id = f"{self.node_id}-{start_ts}"
+            tx = Transaction(tx_id, start_ts=start_ts)
             self._transactions[tx_id] = tx
             return tx_id
 
@@ -89,7 +100,9 @@ class TransactionManager:
     def commit(self, tx_id: str) -> bool:
         tx = self._require_active(tx_id)
 
-        with self._lock:
+        with metrics.histogram("tx_commit_seconds").time(), \
+                metrics.span("commit", tx_id, keys=len(tx.write_set)), \
+                self._lock:
             # Apply buffered writes to the shared store atomically
             for key, value in tx.write_set.items():
                 self._store[key] = value
@@ -103,12 +116,13 @@ class TransactionManager:
                     self._replica_apply_callback(tx.tx_id, dict(tx.write_set), commit_ts)
                 except Exception as e:
                     # We do not roll back the local commit here, but we log the error.
-                    print(f"[TxManager] Replica apply failed for {tx_id}: {e}")
+                    log.error("replica apply failed", tx=tx_id, error=e)
 
             # Release all locks held by this transaction
             self._release_all_locks(tx)
 
-            return True
+        metrics.counter("tx_commits_total").inc()
+        return True
 
     def abort(self, tx_id: str) -> None:
         tx = self._transactions.get(tx_id)
@@ -127,6 +141,8 @@ class TransactionManager:
             tx.status = TxStatus.ABORTED
             self._release_all_locks(tx)
 
+        metrics.counter("tx_aborts_total").inc()
+
     def apply_replica_commit(self, tx_id: str, write_set: Dict[str, Any], commit_ts: int) -> None:
         with self._lock:
             self.clock.update(commit_ts)
@@ -164,6 +180,7 @@ class TransactionManager:
 
     def _acquire_lock(self, tx: Transaction, key: str, mode: LockMode) -> None:
         lock = self._get_lock(key)
+        wait_start = time.perf_counter()
 
         while True:
             with lock._cond:
@@ -172,6 +189,7 @@ class TransactionManager:
                     lock.mode = mode
                     lock.owners.add(tx.tx_id)
                     tx.locked_keys.add(key)
+                    self._record_lock_wait(tx, key, mode, wait_start)
                     return
 
                 # Shared lock request and current mode is SHARED:
@@ -180,6 +198,7 @@ class TransactionManager:
                     # multiple readers allowed
                     lock.owners.add(tx.tx_id)
                     tx.locked_keys.add(key)
+                    self._record_lock_wait(tx, key, mode, wait_start)
                     return
 
                 # Otherwise, we need EXCLUSIVE and someone else holds the lock.
@@ -197,8 +216,8 @@ class TransactionManager:
                 # If this transaction is *younger* than the oldest owner, it dies (aborts)
                 if oldest_owner_ts is not None and tx.start_ts > oldest_owner_ts:
                     # Abort and raise so caller can surface the conflict
-                    print(f"[TxManager] wait-die: aborting younger tx {tx.tx_id} "
-                          f"waiting for older {oldest_owner_tx_id}")
+                    log.warning("wait-die abort", rate=10, tx=tx.tx_id, waiting_for=oldest_owner_tx_id, key=key)
+                    metrics.counter("tx_wait_die_aborts_total").inc()
                     self.abort(tx.tx_id)
                     raise RuntimeError(f"Transaction {tx.tx_id} aborted by wait-die policy")
 
@@ -206,8 +225,19 @@ class TransactionManager:
                 lock.waiting.append((tx.tx_id, mode))
                 lock._cond.wait()
 
+                # Aborted while waiting (e.g. a remote client gave up): never take the lock
+                if tx.status is not TxStatus.ACTIVE:
+                    raise RuntimeError(f"Transaction {tx.tx_id} not ACTIVE ({tx.status})")
+
                 # When notified, loop and re-evaluate
 
+    def _record_lock_wait(self, tx: Transaction, key: str, mode: LockMode, wait_start: float) -> None:
+        waited = time.perf_counter() - wait_start
+        metrics.histogram("lock_wait_seconds", mode.value).observe(waited)
+        if waited > 0.001:
+            # Only trace waits that actually blocked, to keep the span buffer useful
+            metrics.record_span("lock_wait", tx.tx_id, waited, key=key, mode=mode.value)
+
     def _release_all_locks(self, tx: Transaction) -> None:
         for key in list(tx.locked_keys):
             lock = self._locks.get(key)
@@ -0,0 +1,200 @@
+import queue
+import socket
+import zlib
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from IPC.transaction_manager import TxStatus
+from IPC.reservation_manager import Lease
+from IPC.tx_service import ERRORS, recv_frame, send_frame
+
+# Written by the reservation engine on the first service; pinned there
+STATION_PREFIX = "station:"
+
+
+class ConnectionPool:
+    def __init__(self, address: Tuple[str, int], size: int = 8, timeout: float = 30.0) -> None:
+        self.address = address
+        self.timeout = timeout
+        self._idle: "queue.LifoQueue[socket.socket]" = queue.LifoQueue(maxsize=size)
+
+    def _connect(self) -> socket.socket:
+        sock = socket.create_connection(self.address, timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock
+
+    def call(self, op: str, *args: Any) -> Any:
+        try:
+            sock = self._idle.get_nowait()
+        except queue.Empty:
+            sock = self._connect()
+
+        try:
+            send_frame(sock, {"op": op, "args": list(args)})
+            response = recv_frame(sock)
+            if response is None:
+                raise ConnectionError(f"TransactionManager at {self.address} closed the connection")
+        except Exception:
+            sock.close()
+            raise
+
+        try:
+            self._idle.put_nowait(sock)
+        except queue.Full:
+            sock.close()
+
+        if not response["ok"]:
+            raise ERRORS.get(response["error"], RuntimeError)(response["message"])
+        return response["result"]
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class RemoteTransactionManager:
+    """
+    Drop-in client for one or more TransactionManager services
+    (see IPC/tx_service.py), so several API worker processes can share
+    one authoritative lock table and store.
+
+    With several managers, keys are partitioned by crc32(key), except
+    `station:<id>` records, which live with the reservation engine on the
+    first manager (see RemoteReservationManager). A transaction is begun
+    on the first manager, which assigns its global wait-die timestamp,
+    and is opened lazily on the others. Commit checks every partition is
+    still ACTIVE before committing them in turn; a crash between those
+    commits can leave a multi-partition transaction half-applied, so use
+    the 2PC coordinator when that matters.
+    """
+
+    def __init__(self, addresses: Iterable[str], pool_size: int = 8, timeout: float = 30.0) -> None:
+        self.pools: List[ConnectionPool] = []
+        for address in addresses:
+            host, port = address.rsplit(":", 1)
+            self.pools.append(ConnectionPool((host, int(port)), size=pool_size, timeout=timeout))
+        if not self.pools:
+            raise ValueError("RemoteTransactionManager needs at least one address")
+
+    def _pool_for(self, key: str) -> ConnectionPool:
+        if key.startswith(STATION_PREFIX):
+            return self.pools[0]
+        return self.pools[zlib.crc32(key.encode("utf-8")) % len(self.pools)]
+
+    def begin(self) -> str:
+        return self.pools[0].call("begin")
+
+    def read(self, tx_id: str, key: str) -> Any:
+        pool = self._pool_for(key)
+        try:
+            return pool.call("read", tx_id, key, pool is self.pools[0])
+        except (RuntimeError, OSError):
+            self._abandon(tx_id)
+            raise
+
+    def write(self, tx_id: str, key: str, value: Any) -> None:
+        pool = self._pool_for(key)
+        try:
+            pool.call("write", tx_id, key, value, pool is self.pools[0])
+        except (RuntimeError, OSError):
+            self._abandon(tx_id)
+            raise
+
+    def commit(self, tx_id: str) -> bool:
+        try:
+            if len(self.pools) > 1:
+                for pool in self.pools:
+                    status = pool.call("status", tx_id)
+                    if status not in (None, TxStatus.ACTIVE.name):
+                        raise RuntimeError(f"Transaction {tx_id} not ACTIVE ({status})")
+            for pool in self.pools:
+                pool.call("commit", tx_id)
+        except (RuntimeError, OSError):
+            self._abandon(tx_id)
+            raise
+        return True
+
+    def abort(self, tx_id: str) -> None:
+        errors = []
+        for pool in self.pools:
+            try:
+                pool.call("abort", tx_id)
+            except RuntimeError as e:
+                errors.append(e)
+        if errors:
+            raise errors[0]
+
+    def _abandon(self, tx_id: str) -> None:
+        """
+        Abort after a failed call: a wait-die abort on one partition, or a
+        timeout / dropped connection that would otherwise leave the
+        service holding the transaction's locks. Services only roll back
+        partitions that are still ACTIVE and refuse COMMITTED ones, so a
+        late write or a repeated commit never undoes a committed
+        transaction.
+        """
+        for pool in self.pools:
+            try:
+                pool.call("abort", tx_id)
+            except (RuntimeError, OSError):
+                pass
+
+    def dump_store(self) -> Dict[str, Any]:
+        store: Dict[str, Any] = {}
+        for pool in self.pools:
+            store.update(pool.call("dump_store"))
+        return store
+
+    def metrics(self, tx_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Metrics and spans from every service, keyed by "host:port".
+        """
+        return {"%s:%d" % pool.address: pool.call("metrics", tx_id) for pool in self.pools}
+
+    def get_status(self, tx_id: str) -> Optional[TxStatus]:
+        status = self.pools[0].call("status", tx_id)
+        return TxStatus[status] if status is not None else None
+
+    def close(self) -> None:
+        for pool in self.pools:
+            pool.close()
+
+
+class RemoteReservationManager:
+    """
+    Client for the ReservationManager hosted by the first TransactionManager
+    service, so every worker sees the same lease table and free index.
+    The `station:<id>` records it writes live in that manager's store,
+    which is where RemoteTransactionManager routes reads of them.
+    """
+
+    def __init__(self, tx_manager: RemoteTransactionManager) -> None:
+        self._pool = tx_manager.pools[0]
+
+    @staticmethod
+    def _lease(data: Dict[str, Any]) -> Lease:
+        return Lease(data["lease_id"], data["station_id"], data["vehicle_id"], data["expires_at"])
+
+    def register(self, station_ids: Iterable[str]) -> None:
+        self._pool.call("register", list(station_ids))
+
+    def available(self, station_ids: Optional[Iterable[str]] = None) -> List[str]:
+        return self._pool.call("available", list(station_ids) if station_ids is not None else None)
+
+    def reserve(self, station_id: str, vehicle_id: str, ttl: Optional[float] = None) -> Lease:
+        return self._lease(self._pool.call("reserve", station_id, vehicle_id, ttl))
+
+    def reserve_any(self, vehicle_id: str, ttl: Optional[float] = None) -> Lease:
+        return self._lease(self._pool.call("reserve_any", vehicle_id, ttl))
+
+    def renew(self, lease_id: str, ttl: Optional[float] = None) -> Lease:
+        return self._lease(self._pool.call("renew", lease_id, ttl))
+
+    def release(self, lease_id: str) -> Lease:
+        return self._lease(self._pool.call("release", lease_id))
+
+    def start(self) -> None:
+        # Lease expiry runs inside the service
+        pass
@@ -0,0 +1,182 @@
+import argparse
+import json
+import socket
+import socketserver
+import struct
+from typing import Any, Dict, Optional
+
+from IPC.transaction_manager import TransactionManager, TxStatus
+from IPC.reservation_manager import ReservationManager, ReservationConflict
+from IPC.metrics import registry as metrics
+from IPC.async_log import get_logger
+
+log = get_logger("TxService")
+
+# Wire format: 4-byte big-endian length, then a UTF-8 JSON object.
+#   request:  {"op": "<name>", "args": [...]}
+#   response: {"ok": true, "result": ...} | {"ok": false, "error": "<type>", "message": "..."}
+_HEADER = struct.Struct(">I")
+
+ERRORS = {
+    "KeyError": KeyError,
+    "RuntimeError": RuntimeError,
+    "ReservationConflict": ReservationConflict,
+}
+
+
+def send_frame(sock: socket.socket, obj: Dict[str, Any]) -> None:
+    body = json.dumps(obj, separators=(",", ":")).encode("utf-8")
+    sock.sendall(_HEADER.pack(len(body)) + body)
+
+
+def _recv_exact(sock: socket.socket, n: int) -> Optional[bytes]:
+    buf = bytearray()
+    while len(buf) < n:
+        chunk = sock.recv(n - len(buf))
+        if not chunk:
+            return None
+        buf += chunk
+    return bytes(buf)
+
+
+def recv_frame(sock: socket.socket) -> Optional[Dict[str, Any]]:
+    header = _recv_exact(sock, _HEADER.size)
+    if header is None:
+        return None
+    (length,) = _HEADER.unpack(header)
+    body = _recv_exact(sock, length)
+    if body is None:
+        return None
+    return json.loads(body)
+
+
+def start_ts_of(tx_id: str) -> int:
+    # Transaction ids are "<node_id>-<start_ts>" (see TransactionManager.begin)
+    try:
+        return int(tx_id.rsplit("-", 1)[1])
+    except (IndexError, ValueError):
+        raise KeyError(f"Unknown transaction {tx_id}") from None
+
+
+class TxService:
+    """
+    Exposes one TransactionManager (and its ReservationManager) to remote
+    clients. Transactions that first appear on this manager through a
+    read/write are opened lazily with the start timestamp encoded in their
+    id, so every partition orders them the same way under wait-die.
+    """
+
+    def __init__(self, node_id: str) -> None:
+        self.tx_manager = TransactionManager(node_id=node_id)
+        self.reservations = ReservationManager(self.tx_manager)
+        self.reservations.start()
+
+    def _ensure(self, tx_id: str, home: bool) -> None:
+        # The home manager began the transaction itself; only others open it lazily
+        if not home and self.tx_manager.get_status(tx_id) is None:
+            self.tx_manager.begin(tx_id=tx_id, start_ts=start_ts_of(tx_id))
+
+    def op_begin(self):
+        return self.tx_manager.begin()
+
+    def op_read(self, tx_id, key, home=True):
+        self._ensure(tx_id, home)
+        return self.tx_manager.read(tx_id, key)
+
+    def op_write(self, tx_id, key, value, home=True):
+        self._ensure(tx_id, home)
+        self.tx_manager.write(tx_id, key, value)
+
+    def op_commit(self, tx_id):
+        # Partitions this transaction never touched have nothing to commit
+        if self.tx_manager.get_status(tx_id) is None:
+            return True
+        return self.tx_manager.commit(tx_id)
+
+    def op_abort(self, tx_id):
+        # Clients abort every partition after a failed call; replaying the undo
+        # log of a finished transaction would clobber the store
+        status = self.tx_manager.get_status(tx_id)
+        if status is TxStatus.COMMITTED:
+            raise RuntimeError(f"Transaction {tx_id} already COMMITTED")
+        if status is TxStatus.ACTIVE:
+            self.tx_manager.abort(tx_id)
+
+    def op_status(self, tx_id):
+        status = self.tx_manager.get_status(tx_id)
+        return status.name if status is not None else None
+
+    def op_dump_store(self):
+        return self.tx_manager.dump_store()
+
+    def op_metrics(self, tx_id=None):
+        return {"metrics": metrics.snapshot(), "spans": metrics.spans(tx_id)}
+
+    def op_register(self, station_ids):
+        self.reservations.register(station_ids)
+
+    def op_available(self, station_ids=None):
+        return self.reservations.available(station_ids)
+
+    def op_reserve(self, station_id, vehicle_id, ttl=None):
+        return self.reservations.reserve(station_id, vehicle_id, ttl).to_dict()
+
+    def op_reserve_any(self, vehicle_id, ttl=None):
+        return self.reservations.reserve_any(vehicle_id, ttl).to_dict()
+
+    def op_renew(self, lease_id, ttl=None):
+        return self.reservations.renew(lease_id, ttl).to_dict()
+
+    def op_release(self, lease_id):
+        return self.reservations.release(lease_id).to_dict()
+
+    def handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        handler = getattr(self, f"op_{request.get('op')}", None)
+        if handler is None:
+            return {"ok": False, "error": "RuntimeError", "message": f"Unknown op {request.get('op')}"}
+        try:
+            return {"ok": True, "result": handler(*request.get("args", []))}
+        except Exception as e:
+            error = type(e).__name__
+            message = e.args[0] if isinstance(e, KeyError) and e.args else str(e)
+            return {"ok": False, "error": error if error in ERRORS else "RuntimeError", "message": message}
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self) -> None:
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        try:
+            while True:
+                request = recv_frame(self.request)
+                if request is None:
+                    return
+                send_frame(self.request, self.server.service.handle(request))
+        except OSError:
+            # Client gave up (e.g. timed out during a lock wait) and closed
+            return
+
+
+class TxServer(socketserver.ThreadingTCPServer):
+    # One thread per client connection: lock waits block only that connection
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, service: TxService) -> None:
+        super().__init__(address, _Handler)
+        self.service = service
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Standalone TransactionManager service")
+    parser.add_argument("--node-id", default="txm-0")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9100)
+    args = parser.parse_args()
+
+    with TxServer((args.host, args.port), TxService(args.node_id)) as server:
+        log.info(f"TransactionManager {args.node_id} listening on {args.host}:{args.port}")
+        server.serve_forever()
+
+
+if __name__ == "__main__":
+    main()
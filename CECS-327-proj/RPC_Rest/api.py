@@ -1,17 +1,39 @@
 from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from datetime import datetime
 import socket
 import json
-import zmq
 import time
 from typing import Dict, Any
+import os
 from IPC.transaction_manager import TransactionManager
+from IPC.reservation_manager import ReservationManager, ReservationConflict
+from IPC.tx_client import RemoteTransactionManager, RemoteReservationManager
+from IPC.metrics import registry as metrics
+from IPC.async_log import get_logger
+from IPC.peer_link import PEER_BATCHING, get_link
 
 app = FastAPI(title="Messaging Service API")
 
-# One TransactionManager per node / process (GLOBAL SINGLETON)
-tx_manager = TransactionManager(node_id="api-node")
+# TX_MANAGERS="host:port,..." points every worker at shared TransactionManager
+# services (python -m IPC.tx_service); otherwise one in-process manager
+# per node / process (GLOBAL SINGLETON).
+TX_MANAGERS = [a.strip() for a in os.environ.get("TX_MANAGERS", "").split(",") if a.strip()]
+
+if TX_MANAGERS:
+    tx_manager = RemoteTransactionManager(TX_MANAGERS)
+    reservations = RemoteReservationManager(tx_manager)
+else:
+    tx_manager = TransactionManager(node_id="api-node")
+    # Station leases, backed by the same TransactionManager
+    reservations = ReservationManager(tx_manager)
+reservations.start()
+
+tcp_log = get_logger("TCP")
+zmq_log = get_logger("ZMQ")
+tx_log = get_logger("TX")
+reserve_log = get_logger("RESERVE")
+debug_log = get_logger("DEBUG")
 
 
 # -----------------------------
@@ -39,6 +61,20 @@ class TxReadResponse(BaseModel):
 class ReservationRequest(BaseModel):
     station_id: str
     vehicle_id: str
+    ttl: float | None = Field(default=None, gt=0)
+
+
+class ReserveAnyRequest(BaseModel):
+    vehicle_id: str
+    ttl: float | None = Field(default=None, gt=0)
+
+
+class LeaseRenewRequest(BaseModel):
+    ttl: float | None = Field(default=None, gt=0)
+
+
+class StationRegisterRequest(BaseModel):
+    station_ids: list[str]
 
 
 # temp storage
@@ -85,13 +121,20 @@ async def get_messages():
 def tcp_connection(message: dict, host: str = "127.0.0.1", port: int = 7896):
     """
     Helper function to forward messages from FastAPI to TCP server.
+    With PEER_BATCHING=1 the message is queued on a coalescing link instead
+    (the link records tcp_send_seconds per batch).
     """
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-        s.connect((host, port))
-        payload = json.dumps(message).encode("utf-8")
-        s.sendall(payload)
-        response = s.recv(1024).decode("utf-8")
-        print(f"[TCP RESPONSE] {response}")
+    if PEER_BATCHING:
+        get_link(f"{host}:{port}").send(json.dumps(message))
+        return
+
+    with metrics.histogram("tcp_send_seconds", f"{host}:{port}").time():
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+            s.connect((host, port))
+            payload = json.dumps(message).encode("utf-8")
+            s.sendall(payload)
+            response = s.recv(1024).decode("utf-8")
+    tcp_log.debug("response", response=response)
 
 
 # -----------------------------
@@ -102,7 +145,10 @@ def publish_update(message: dict):
     Helper function to connect pub/sub system to API.
     Publishes 'new_messages' events.
     """
+    queue_depth = metrics.gauge("zmq_publish_queue_depth")
+    queue_depth.inc()
     try:
+        import zmq  # deferred: pyzmq is slow to import and only needed here
         context = zmq.Context()
         pub_socket = context.socket(zmq.PUB)
         pub_socket.connect("tcp://127.0.0.1:5556")  # connect to pub server
@@ -110,9 +156,13 @@ def publish_update(message: dict):
         pub_socket.send_string(f"new_messages {json.dumps(message)}")
         pub_socket.close()
         context.term()
-        print(f"Published new message event for {message['sender']}")
+        zmq_log.debug("published new message event", sender=message["sender"])
+        metrics.counter("zmq_published_total").inc()
     except Exception as e:
-        print(f"Failed to publish update: {e}")
+        metrics.counter("zmq_publish_errors_total").inc()
+        zmq_log.error("failed to publish update", rate=5, error=e)
+    finally:
+        queue_depth.dec()
 
 
 # -----------------------------
@@ -124,7 +174,7 @@ def begin_transaction():
     Begin a new transaction.
     """
     tx_id = tx_manager.begin()
-    print(f"[TX] BEGIN {tx_id}")
+    tx_log.debug("BEGIN", tx=tx_id)
     return TxBeginResponse(tx_id=tx_id)
 
 
@@ -134,11 +184,11 @@ def transactional_write(tx_id: str, body: TxWriteRequest):
     Transactional write(key, value) under strict 2PL.
     """
     try:
-        print(f"[TX] WRITE {tx_id} key={body.key} value={body.value}")
+        tx_log.debug("WRITE", tx=tx_id, key=body.key, value=body.value)
         tx_manager.write(tx_id, body.key, body.value)
         return {"status": "ok"}
     except Exception as e:
-        print(f"[TX] WRITE ERROR for {tx_id}: {e}")
+        tx_log.warning("WRITE ERROR", rate=10, tx=tx_id, error=e)
         raise HTTPException(status_code=400, detail=str(e))
 
 
@@ -148,11 +198,11 @@ def transactional_read(tx_id: str, key: str):
     Transactional read(key) that obeys locks and read-your-own-writes.
     """
     try:
-        print(f"[TX] READ {tx_id} key={key}")
+        tx_log.debug("READ", tx=tx_id, key=key)
         value = tx_manager.read(tx_id, key)
         return TxReadResponse(key=key, value=value)
     except Exception as e:
-        print(f"[TX] READ ERROR for {tx_id}: {e}")
+        tx_log.warning("READ ERROR", rate=10, tx=tx_id, error=e)
         raise HTTPException(status_code=400, detail=str(e))
 
 
@@ -162,14 +212,14 @@ def commit_transaction(tx_id: str):
     Commit a transaction. Applies all its buffered writes atomically.
     """
     try:
-        print(f"[TX] COMMIT {tx_id}")
+        tx_log.debug("COMMIT", tx=tx_id)
         ok = tx_manager.commit(tx_id)
         if not ok:
-            print(f"[TX] COMMIT ABORTED {tx_id}")
+            tx_log.warning("COMMIT ABORTED", tx=tx_id)
             raise HTTPException(status_code=409, detail="Transaction was aborted")
         return {"status": "committed"}
     except Exception as e:
-        print(f"[TX] COMMIT ERROR for {tx_id}: {e}")
+        tx_log.warning("COMMIT ERROR", rate=10, tx=tx_id, error=e)
         raise HTTPException(status_code=400, detail=str(e))
 
 
@@ -178,8 +228,12 @@ def abort_transaction(tx_id: str):
     """
     Abort a transaction and roll back any changes.
     """
-    print(f"[TX] ABORT {tx_id}")
-    tx_manager.abort(tx_id)
+    tx_log.debug("ABORT", tx=tx_id)
+    try:
+        tx_manager.abort(tx_id)
+    except RuntimeError as e:
+        # Shared services refuse to roll back a committed transaction
+        raise HTTPException(status_code=409, detail=str(e))
     return {"status": "aborted"}
 
 
@@ -193,66 +247,121 @@ def debug_store() -> Dict[str, Any]:
     ONLY for debugging / testing.
     """
     store = tx_manager.dump_store()
-    print(f"[DEBUG] STORE {store}")
+    debug_log.debug("STORE", store=store)
     return store
 
 
 # -----------------------------
-# Reservation example: prevent double-booking
+# Metrics endpoint
 # -----------------------------
+@app.get("/metrics")
+def get_metrics(tx_id: str | None = None) -> Dict[str, Any]:
+    """
+    Return counters and latency histograms for the hot paths.
+    Trace spans are included when TRACE_TX=1 (optionally filtered by tx_id).
+    With TX_MANAGERS set, each service's own metrics (lock waits, wait-die,
+    commits) are under "tx_managers".
+    """
+    result = {"metrics": metrics.snapshot(), "spans": metrics.spans(tx_id)}
+    if TX_MANAGERS:
+        result["tx_managers"] = tx_manager.metrics(tx_id)
+    return result
+
+
+# -----------------------------
+# Reservations: TTL leases, prevent double-booking
+# -----------------------------
+def publish_reservation(vehicle_id: str, station_id: str):
+    # OPTIONAL: publish an event via existing ZeroMQ publisher
+    publish_update(
+        {
+            "sender": "reservation-system",
+            "content": f"{vehicle_id} reserved station {station_id}",
+            "timestamp": datetime.utcnow().isoformat(),
+        }
+    )
+
+
+@app.post("/stations/register")
+def register_stations(body: StationRegisterRequest):
+    """
+    Add stations to the availability index (they start out free).
+    """
+    reservations.register(body.station_ids)
+    return {"status": "ok", "available": len(reservations.available())}
+
+
+@app.get("/stations/available")
+def available_stations(station_ids: str | None = None):
+    """
+    Bulk availability query. With no `station_ids` (comma-separated),
+    returns every free station.
+    """
+    ids = station_ids.split(",") if station_ids else None
+    return {"available": reservations.available(ids)}
+
+
 @app.post("/stations/reserve")
 def reserve_station(body: ReservationRequest):
     """
-    Example transactional operation:
-
     Reserve a charging station so that only one vehicle can hold it
-    at a time, even under concurrent requests.
+    at a time, even under concurrent requests. The reservation is a
+    lease that expires after `ttl` seconds unless renewed.
     """
-    tx_id = tx_manager.begin()
-    key = f"station:{body.station_id}"
-
     try:
-        print(f"[RESERVE] BEGIN tx={tx_id} station={body.station_id} vehicle={body.vehicle_id}")
-
-        # Check current reservation under shared lock
-        current_holder = tx_manager.read(tx_id, key)
-        if current_holder is not None:
-            # Someone already has this station
-            tx_manager.abort(tx_id)
-            print(f"[RESERVE] CONFLICT station={body.station_id} held by {current_holder}")
-            raise HTTPException(
-                status_code=409,
-                detail=f"Station {body.station_id} already reserved by {current_holder}",
-            )
-
-        # Reserve it under exclusive lock
-        tx_manager.write(tx_id, key, body.vehicle_id)
-
-        # Commit makes the reservation visible atomically
-        tx_manager.commit(tx_id)
-
-        # OPTIONAL: publish an event via existing ZeroMQ publisher
-        publish_update(
-            {
-                "sender": "reservation-system",
-                "content": f"{body.vehicle_id} reserved station {body.station_id}",
-                "timestamp": datetime.utcnow().isoformat(),
-            }
-        )
-
-        print(f"[RESERVE] SUCCESS tx={tx_id} station={body.station_id} vehicle={body.vehicle_id}")
-        return {
-            "status": "reserved",
-            "station_id": body.station_id,
-            "vehicle_id": body.vehicle_id,
-            "tx_id": tx_id,
-        }
+        lease = reservations.reserve(body.station_id, body.vehicle_id, body.ttl)
+    except ReservationConflict as e:
+        reserve_log.info("CONFLICT", rate=10, station=body.station_id, error=e)
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        reserve_log.error("ERROR", station=body.station_id, error=e)
+        raise HTTPException(status_code=500, detail=f"Reservation failed: {e}")
+
+    publish_reservation(lease.vehicle_id, lease.station_id)
+    reserve_log.info("SUCCESS", lease=lease.lease_id, station=lease.station_id, vehicle=lease.vehicle_id)
+    return {"status": "reserved", **lease.to_dict()}
+
 
-    except HTTPException:
-        # bubbled up error, already aborted
-        raise
+@app.post("/stations/reserve_any")
+def reserve_any_station(body: ReserveAnyRequest):
+    """
+    Reserve whichever station is free first.
+    """
+    try:
+        lease = reservations.reserve_any(body.vehicle_id, body.ttl)
+    except ReservationConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
-        # Any error: abort and surface
-        print(f"[RESERVE] ERROR tx={tx_id}: {e}")
-        tx_manager.abort(tx_id)
+        reserve_log.error("ERROR", vehicle=body.vehicle_id, error=e)
         raise HTTPException(status_code=500, detail=f"Reservation failed: {e}")
+
+    publish_reservation(lease.vehicle_id, lease.station_id)
+    reserve_log.info("SUCCESS", lease=lease.lease_id, station=lease.station_id, vehicle=lease.vehicle_id)
+    return {"status": "reserved", **lease.to_dict()}
+
+
+@app.post("/stations/leases/{lease_id}/renew")
+def renew_lease(lease_id: str, body: LeaseRenewRequest):
+    """
+    Extend a lease by `ttl` seconds from now.
+    """
+    try:
+        lease = reservations.renew(lease_id, body.ttl)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    return {"status": "renewed", **lease.to_dict()}
+
+
+@app.post("/stations/leases/{lease_id}/release")
+def release_lease(lease_id: str):
+    """
+    Give a station back before its lease expires.
+    """
+    try:
+        lease = reservations.release(lease_id)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        reserve_log.error("ERROR", lease=lease_id, error=e)
+        raise HTTPException(status_code=500, detail=f"Release failed: {e}")
+    return {"status": "released", **lease.to_dict()}
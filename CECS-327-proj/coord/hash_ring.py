@@ -0,0 +1,92 @@
+import hashlib
+from bisect import bisect_right
+from typing import Dict, Iterable, List, Set, Tuple
+
+
+def _hash(value: str) -> int:
+    return int.from_bytes(hashlib.md5(value.encode("utf-8")).digest()[:8], "big")
+
+
+class HashRing:
+    """
+    Consistent-hash ring mapping keys to `replication_factor` distinct nodes.
+
+    Each node is placed at `vnodes` points on the ring; a key is owned by the
+    first distinct nodes found walking clockwise from its hash. Adding or
+    removing a node only changes ownership of keys next to that node's points.
+    """
+
+    def __init__(self, nodes: Iterable[str] = (), replication_factor: int = 3, vnodes: int = 64) -> None:
+        self.replication_factor = replication_factor
+        self.vnodes = vnodes
+        self._nodes: Set[str] = set()
+        self._points: List[int] = []
+        self._owners: List[str] = []
+        for node in nodes:
+            self._nodes.add(node)
+        self._rebuild()
+
+    @property
+    def nodes(self) -> List[str]:
+        return sorted(self._nodes)
+
+    def _rebuild(self) -> None:
+        ring: List[Tuple[int, str]] = sorted(
+            (_hash(f"{node}#{i}"), node) for node in self._nodes for i in range(self.vnodes)
+        )
+        self._points = [p for p, _ in ring]
+        self._owners = [n for _, n in ring]
+
+    def add_node(self, node: str) -> None:
+        if node not in self._nodes:
+            self._nodes.add(node)
+            self._rebuild()
+
+    def remove_node(self, node: str) -> None:
+        if node in self._nodes:
+            self._nodes.discard(node)
+            self._rebuild()
+
+    def owners(self, key: str) -> List[str]:
+        if not self._points:
+            return []
+        want = min(self.replication_factor, len(self._nodes))
+        result: List[str] = []
+        i = bisect_right(self._points, _hash(key))
+        while len(result) < want:
+            node = self._owners[i % len(self._owners)]
+            if node not in result:
+                result.append(node)
+            i += 1
+        return result
+
+    def owners_for(self, keys: Iterable[str]) -> List[str]:
+        """
+        Union of replicas for every key a transaction touches, in stable order.
+        """
+        result: List[str] = []
+        for key in keys:
+            for node in self.owners(key):
+                if node not in result:
+                    result.append(node)
+        return result
+
+    def copy(self) -> "HashRing":
+        ring = HashRing(replication_factor=self.replication_factor, vnodes=self.vnodes)
+        ring._nodes = set(self._nodes)
+        ring._points = list(self._points)
+        ring._owners = list(self._owners)
+        return ring
+
+
+def moved_keys(old: HashRing, new: HashRing, keys: Iterable[str]) -> Dict[str, Tuple[List[str], List[str]]]:
+    """
+    Keys whose replica set changed between two rings, as
+    key -> (nodes that gained the key, nodes that lost it).
+    """
+    moves = {}
+    for key in keys:
+        before, after = set(old.owners(key)), set(new.owners(key))
+        if before != after:
+            moves[key] = (sorted(after - before), sorted(before - after))
+    return moves
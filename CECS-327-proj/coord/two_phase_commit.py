@@ -1,27 +1,47 @@
 import os
-import json
-import time
-import asyncio
 from pathlib import Path
 from fastapi import FastAPI
 from pydantic import BaseModel
-import httpx
+from IPC.metrics import registry as metrics
+from coord.two_phase_node import TwoPhaseNode
 
 NODE_ID = os.environ.get("NODE_ID", "1")
 PEERS = [p.strip() for p in os.environ.get("PEERS", "").split(",") if p.strip()]
 WAL = Path(f"./wal_{NODE_ID}.log")
+# This node's own URL as it appears in other nodes' PEERS. Required when
+# REPLICATION_FACTOR is below the cluster size so every node builds the same ring.
+SELF_URL = os.environ.get("SELF_URL", "")
+# Each key lives on REPLICATION_FACTOR nodes picked by consistent hashing;
+# unset keeps every key on every node
+REPLICATION_FACTOR = int(os.environ["REPLICATION_FACTOR"]) if os.environ.get("REPLICATION_FACTOR") else None
 
 app = FastAPI()
 
-STORE = {}
-STAGED = {}
-LOCKS = {}
-TX = {}
+_client = None
 
 
-def log_write(data):
-    with WAL.open("a") as f:
-        f.write(json.dumps({"ts": time.time(), **data}) + "\n")
+async def http_transport(peer, endpoint, payload):
+    global _client
+    if _client is None:
+        import httpx  # deferred: only needed once a remote peer is contacted
+        _client = httpx.AsyncClient(timeout=3.0)
+    r = await _client.post(f"{peer}{endpoint}", json=payload)
+    r.raise_for_status()
+    return r.json()
+
+
+NODE = TwoPhaseNode(
+    NODE_ID,
+    PEERS,
+    http_transport,
+    wal_path=WAL,
+    self_url=SELF_URL,
+    replication_factor=REPLICATION_FACTOR,
+)
+STORE = NODE.store
+STAGED = NODE.staged
+LOCKS = NODE.locks
+TX = NODE.tx
 
 
 class TxStart(BaseModel):
@@ -36,48 +56,29 @@ class Prepare(BaseModel):
     value: str
 
 
-@app.post("/prepare")
-async def prepare(req: Prepare):
-    tx_id = req.tx_id
-    key = req.key
+class Membership(BaseModel):
+    peer: str
+    propagate: bool = True
+
+
+class Replicate(BaseModel):
+    key: str
+    value: str
 
-    if key in LOCKS and LOCKS[key] != tx_id:
-        TX[tx_id] = "ABORTED"
-        log_write({"prep": "NO", "tx": tx_id})
-        return {"vote": "NO", "node": NODE_ID}
 
-    LOCKS[key] = tx_id
-    STAGED[tx_id] = {"key": key, "value": req.value}
-    TX[tx_id] = "PREPARED"
-    log_write({"prep": "YES", "tx": tx_id})
-    return {"vote": "YES", "node": NODE_ID}
+@app.post("/prepare")
+async def prepare(req: Prepare):
+    return NODE.prepare(req.model_dump())
 
 
 @app.post("/commit")
 async def commit(req: Prepare):
-    tx_id = req.tx_id
-    if tx_id in STAGED:
-        key = STAGED[tx_id]["key"]
-        STORE[key] = STAGED[tx_id]["value"]
-        LOCKS.pop(key, None)
-        STAGED.pop(tx_id, None)
-
-    TX[tx_id] = "COMMITTED"
-    log_write({"commit": tx_id})
-    return {"ok": True, "node": NODE_ID}
+    return NODE.commit(req.model_dump())
 
 
 @app.post("/abort")
 async def abort(req: Prepare):
-    tx_id = req.tx_id
-    if tx_id in STAGED:
-        key = STAGED[tx_id]["key"]
-        LOCKS.pop(key, None)
-        STAGED.pop(tx_id, None)
-
-    TX[tx_id] = "ABORTED"
-    log_write({"abort": tx_id})
-    return {"ok": True, "node": NODE_ID}
+    return NODE.abort(req.model_dump())
 
 
 @app.get("/kv/{key}")
@@ -87,54 +88,41 @@ def get_value(key: str):
 
 @app.get("/state")
 def get_state():
+    return NODE.state()
+
+
+@app.get("/ring/owners/{key}")
+def get_owners(key: str):
+    return {"key": key, "owners": NODE.ring.owners(key)}
+
+
+@app.post("/replicate")
+def replicate(req: Replicate):
+    """
+    Install a committed value moved here by rebalancing.
+    """
+    return NODE.replicate(req.model_dump())
+
+
+@app.post("/ring/join")
+async def ring_join(req: Membership):
+    return await NODE.change_membership(req.peer, join=True, propagate=req.propagate)
+
+
+@app.post("/ring/leave")
+async def ring_leave(req: Membership):
+    return await NODE.change_membership(req.peer, join=False, propagate=req.propagate)
+
+
+@app.get("/metrics")
+def get_metrics(tx_id: str | None = None):
     return {
         "node": NODE_ID,
-        "store": STORE,
-        "locks": LOCKS,
-        "staged": STAGED,
-        "tx": TX,
-        "peers": PEERS
+        "metrics": metrics.snapshot(),
+        "spans": metrics.spans(tx_id),
     }
 
 
 @app.post("/start")
 async def start_tx(req: TxStart):
-
-    tx_id = req.tx_id
-    TX[tx_id] = "STARTED"
-    log_write({"start": tx_id})
-
-    votes = {}
-    all_yes = True
-
-    async with httpx.AsyncClient(timeout=3.0) as client:
-        results = await asyncio.gather(
-            *[client.post(f"{p}/prepare", json=req.model_dump()) for p in PEERS],
-            return_exceptions=True
-        )
-
-    for peer, r in zip(PEERS, results):
-        if isinstance(r, Exception):
-            votes[peer] = "NO"
-            all_yes = False
-        else:
-            info = r.json()
-            votes[info["node"]] = info["vote"]
-            if info["vote"] != "YES":
-                all_yes = False
-
-    decision = "commit" if all_yes else "abort"
-    log_write({"decision": decision, "tx": tx_id})
-
-    endpoint = "/commit" if decision == "commit" else "/abort"
-    async with httpx.AsyncClient(timeout=3.0) as client:
-        await asyncio.gather(
-            *[client.post(f"{p}{endpoint}", json={"tx_id": tx_id, "key": req.key, "value": req.value}) for p in PEERS],
-            return_exceptions=True
-        )
-
-    if decision == "commit":
-        STORE[req.key] = req.value
-
-    TX[tx_id] = decision.upper()
-    return {"tx": tx_id, "decision": decision, "votes": votes}
+    return await NODE.start(req.model_dump())
@@ -0,0 +1,282 @@
+import asyncio
+import json
+import time
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+from IPC.metrics import registry as metrics
+from coord.hash_ring import HashRing, moved_keys
+
+# async send(peer, endpoint, payload) -> response dict; raises on failure
+Transport = Callable[[str, str, Dict[str, Any]], Awaitable[Dict[str, Any]]]
+
+HANDOFF_ATTEMPTS = 3
+HANDOFF_BACKOFF = 0.5  # seconds, times the attempt number
+
+
+class TwoPhaseNode:
+    """
+    One node's 2PC participant and coordinator state, independent of how
+    messages travel. coord/two_phase_commit.py serves it over HTTP; the
+    cluster simulator runs many of them in one process over an in-memory
+    transport.
+
+    The hash ring holds the whole cluster (this node plus `peers`), so
+    every node agrees on each key's owners. `replication_factor=None`
+    keeps every key on every node, also as members join and leave.
+    `self_url` must be this node's address as the others list it; without
+    it the node can only take part when every node replicates every key,
+    and it appears in its own ring under a local name.
+    """
+
+    def __init__(
+        self,
+        node_id: str,
+        peers: List[str],
+        transport: Transport,
+        wal_path: Optional[Path] = None,
+        self_url: str = "",
+        replication_factor: Optional[int] = None,
+        on_commit: Optional[Callable[[str, Any], None]] = None,
+    ) -> None:
+        self.node_id = node_id
+        self.peers = peers
+        self.transport = transport
+        self.wal_path = wal_path
+        self.self_url = self_url
+        # This node's name on the ring; requests to it are handled in-process
+        self.member = self_url or f"local:{node_id}"
+        self.replication_factor = replication_factor
+        members = set(peers) | {self.member}
+        self._check_membership(len(members))
+        self.ring = HashRing(members, replication_factor=replication_factor or len(members))
+        self.on_commit = on_commit
+        # Keys this node no longer owns but could not hand off yet
+        self.pending_handoff: Set[str] = set()
+
+        self.store: Dict[str, Any] = {}
+        self.staged: Dict[str, Dict[str, Any]] = {}
+        self.locks: Dict[str, str] = {}
+        self.tx: Dict[str, str] = {}
+
+    def _check_membership(self, cluster_size: int) -> None:
+        if self.replication_factor is None:
+            return
+        if not self.self_url and self.replication_factor < cluster_size:
+            raise ValueError(
+                f"SELF_URL is required when the replication factor ({self.replication_factor}) "
+                f"is below the cluster size ({cluster_size})"
+            )
+
+    def log_write(self, data):
+        if self.wal_path is None:
+            return
+        with metrics.histogram("wal_write_seconds").time():
+            with self.wal_path.open("a") as f:
+                f.write(json.dumps({"ts": time.time(), **data}) + "\n")
+
+    async def timed_send(self, peer, endpoint, payload):
+        """
+        Send to a peer and record the round trip in the per-peer phase histogram.
+        """
+        start = time.perf_counter()
+        try:
+            if peer == self.member:
+                # This node is one of the participants: no network hop
+                return self.handle(endpoint, payload)
+            return await self.transport(peer, endpoint, payload)
+        finally:
+            elapsed = time.perf_counter() - start
+            metrics.histogram(f"2pc{endpoint.replace('/', '_')}_seconds", peer).observe(elapsed)
+            metrics.record_span(endpoint.strip("/"), payload["tx_id"], elapsed, peer=peer)
+
+    def _apply(self, key, value):
+        self.store[key] = value
+        if self.on_commit is not None:
+            self.on_commit(key, value)
+
+    # -----------------------------
+    # Participant
+    # -----------------------------
+    def prepare(self, req: Dict[str, Any]) -> Dict[str, Any]:
+        tx_id = req["tx_id"]
+        key = req["key"]
+
+        if key in self.locks and self.locks[key] != tx_id:
+            self.tx[tx_id] = "ABORTED"
+            self.log_write({"prep": "NO", "tx": tx_id})
+            return {"vote": "NO", "node": self.node_id}
+
+        self.locks[key] = tx_id
+        self.staged[tx_id] = {"key": key, "value": req["value"]}
+        self.tx[tx_id] = "PREPARED"
+        self.log_write({"prep": "YES", "tx": tx_id})
+        return {"vote": "YES", "node": self.node_id}
+
+    def commit(self, req: Dict[str, Any]) -> Dict[str, Any]:
+        tx_id = req["tx_id"]
+        if tx_id in self.staged:
+            staged = self.staged.pop(tx_id)
+            self._apply(staged["key"], staged["value"])
+            self.locks.pop(staged["key"], None)
+
+        self.tx[tx_id] = "COMMITTED"
+        self.log_write({"commit": tx_id})
+        return {"ok": True, "node": self.node_id}
+
+    def abort(self, req: Dict[str, Any]) -> Dict[str, Any]:
+        tx_id = req["tx_id"]
+        if tx_id in self.staged:
+            staged = self.staged.pop(tx_id)
+            self.locks.pop(staged["key"], None)
+
+        self.tx[tx_id] = "ABORTED"
+        self.log_write({"abort": tx_id})
+        return {"ok": True, "node": self.node_id}
+
+    def replicate(self, req: Dict[str, Any]) -> Dict[str, Any]:
+        self._apply(req["key"], req["value"])
+        self.log_write({"replicate": req["key"]})
+        return {"ok": True, "node": self.node_id}
+
+    def handle(self, endpoint: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Dispatch an incoming participant message by endpoint name.
+        """
+        handler = {
+            "/prepare": self.prepare,
+            "/commit": self.commit,
+            "/abort": self.abort,
+            "/replicate": self.replicate,
+        }.get(endpoint)
+        if handler is None:
+            raise KeyError(f"Unknown endpoint {endpoint}")
+        return handler(payload)
+
+    # -----------------------------
+    # Coordinator
+    # -----------------------------
+    async def start(self, req: Dict[str, Any]) -> Dict[str, Any]:
+        tx_id = req["tx_id"]
+        tx_start = time.perf_counter()
+        self.tx[tx_id] = "STARTED"
+        self.log_write({"start": tx_id})
+
+        votes = {}
+        all_yes = True
+        # Only the replicas that own this key take part
+        participants = self.ring.owners_for([req["key"]])
+
+        results = await asyncio.gather(
+            *[self.timed_send(p, "/prepare", req) for p in participants],
+            return_exceptions=True
+        )
+
+        for peer, r in zip(participants, results):
+            if isinstance(r, Exception):
+                votes[peer] = "NO"
+                all_yes = False
+            else:
+                votes[r["node"]] = r["vote"]
+                if r["vote"] != "YES":
+                    all_yes = False
+
+        decision = "commit" if all_yes else "abort"
+        metrics.counter(f"2pc_{decision}s_total").inc()
+        self.log_write({"decision": decision, "tx": tx_id})
+
+        endpoint = "/commit" if decision == "commit" else "/abort"
+        payload = {"tx_id": tx_id, "key": req["key"], "value": req["value"]}
+        await asyncio.gather(
+            *[self.timed_send(p, endpoint, payload) for p in participants],
+            return_exceptions=True
+        )
+
+        self.tx[tx_id] = decision.upper()
+        metrics.histogram("2pc_tx_seconds").observe(time.perf_counter() - tx_start)
+        return {"tx": tx_id, "decision": decision, "votes": votes}
+
+    # -----------------------------
+    # Membership
+    # -----------------------------
+    async def rebalance(self, old_ring: HashRing):
+        """
+        Push keys held here to nodes that became replicas for them, and
+        forget keys this node stopped owning once a new owner has
+        acknowledged them. Keys nobody acknowledged stay here, in
+        `pending_handoff`, and are pushed again on the next rebalance.
+        Untouched keys do not move.
+        """
+        moves = moved_keys(old_ring, self.ring, list(self.store))
+        targets = {key: [n for n in gained if n != self.member] for key, (gained, _) in moves.items()}
+        for key in self.pending_handoff:
+            if key in self.store and key not in targets:
+                targets[key] = [n for n in self.ring.owners(key) if n != self.member]
+
+        acked: Set[str] = set()
+        remaining = {key: list(nodes) for key, nodes in targets.items() if nodes}
+        for attempt in range(HANDOFF_ATTEMPTS):
+            if not remaining:
+                break
+            if attempt:
+                await asyncio.sleep(HANDOFF_BACKOFF * attempt)
+            sends = [(key, node) for key, nodes in remaining.items() for node in nodes]
+            results = await asyncio.gather(
+                *[self.transport(node, "/replicate", {"key": key, "value": self.store[key]}) for key, node in sends],
+                return_exceptions=True
+            )
+            for (key, node), r in zip(sends, results):
+                if not isinstance(r, Exception):
+                    acked.add(key)
+                    remaining[key].remove(node)
+            remaining = {key: nodes for key, nodes in remaining.items() if nodes}
+
+        for key, nodes in targets.items():
+            if self.member in self.ring.owners(key):
+                self.pending_handoff.discard(key)
+            elif key in acked or not nodes:
+                self.store.pop(key, None)
+                self.pending_handoff.discard(key)
+            else:
+                self.pending_handoff.add(key)
+        metrics.counter("ring_keys_moved_total").inc(len(moves))
+        metrics.gauge("ring_pending_handoff").set(len(self.pending_handoff))
+        return moves
+
+    async def change_membership(self, peer: str, join: bool, propagate: bool = True):
+        old_ring = self.ring.copy()
+        if join:
+            self._check_membership(len(set(old_ring.nodes) | {peer}))
+            self.ring.add_node(peer)
+            if peer not in self.peers:
+                self.peers.append(peer)
+        else:
+            self.ring.remove_node(peer)
+            if peer in self.peers:
+                self.peers.remove(peer)
+        if self.replication_factor is None:
+            self.ring.replication_factor = max(1, len(self.ring.nodes))
+        self.log_write({"join" if join else "leave": peer})
+
+        if propagate:
+            endpoint = "/ring/join" if join else "/ring/leave"
+            targets = (set(old_ring.nodes) | {peer}) - {self.member}
+            await asyncio.gather(
+                *[self.transport(p, endpoint, {"peer": peer, "propagate": False}) for p in targets],
+                return_exceptions=True
+            )
+
+        moves = await self.rebalance(old_ring)
+        return {"node": self.node_id, "peers": self.ring.nodes, "moved": len(moves)}
+
+    def state(self) -> Dict[str, Any]:
+        return {
+            "node": self.node_id,
+            "store": self.store,
+            "locks": self.locks,
+            "staged": self.staged,
+            "tx": self.tx,
+            "peers": self.peers,
+            "replication_factor": self.ring.replication_factor,
+            "pending_handoff": sorted(self.pending_handoff),
+        }
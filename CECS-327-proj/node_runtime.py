@@ -0,0 +1,164 @@
+"""
+Single-process node: 2PC participant/coordinator, peer TCP server and the
+interactive send path all on one asyncio loop.
+
+Replaces running `uvicorn coord.two_phase_commit:app` and `IPC/p2p_node.py`
+side by side. The node's own coordinator is called in-process instead of
+over localhost HTTP; other nodes still reach it over HTTP as before.
+
+Usage (from CECS-327-proj, same env vars as the coordinator):
+    python node_runtime.py <node_id> <peer host:port>... [--coord-host IP] [--coord-port PORT]
+"""
+import argparse
+import asyncio
+import os
+
+from IPC.p2p_node import Node, ANTI_ENTROPY_INTERVAL
+from IPC.TCPServer import handle_message
+from IPC.peer_link import LINK_MAGIC, serve_link_async
+from IPC.async_log import get_logger
+
+log = get_logger("Runtime")
+
+
+class NodeRuntime(Node):
+    def __init__(self, node_id, peers, coord_host="127.0.0.1", coord_port=None):
+        super().__init__(node_id, peers=peers)
+        self.coord_host = coord_host
+        # Same default as p2p_node.send_test_message
+        self.coord_port = coord_port or 8000 + int(node_id) - 1
+        self.loop = None
+        self.coord = None
+        # asyncio keeps only weak references to tasks; hold in-flight sends here
+        self._tasks = set()
+
+    # -----------------------------
+    # Peer TCP server
+    # -----------------------------
+    async def _handle_peer(self, reader, writer):
+        addr = writer.get_extra_info("peername")
+        data = await reader.read(1024)
+
+        def handle(message):
+            try:
+                handle_message(self, message, addr[0])
+            except Exception as e:
+                log.error("bad message on link", rate=5, sender=addr[0], error=e)
+
+        if data.startswith(LINK_MAGIC):
+            await serve_link_async(reader, writer, data[len(LINK_MAGIC):], handle)
+            return
+
+        try:
+            while data:
+                reply = handle_message(self, data.decode("utf-8"), addr[0])
+                writer.write(reply.encode("utf-8"))
+                await writer.drain()
+                data = await reader.read(1024)
+        except Exception as e:
+            log.error("connection failed", error=e)
+        finally:
+            writer.close()
+
+    # -----------------------------
+    # Send path
+    # -----------------------------
+    def send_to_peer(self, peer, message):
+        if self.batching:
+            super().send_to_peer(peer, message)
+            return
+        self._spawn(self._send_direct(peer, message))
+
+    def queue_send(self, peer, frame):
+        if self.batching:
+            super().queue_send(peer, frame)
+            return
+        self._spawn(self._send_direct(peer, frame))
+
+    def _spawn(self, coro):
+        task = self.loop.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send_direct(self, peer, raw):
+        host, port = peer.split(":")
+        try:
+            reader, writer = await asyncio.wait_for(asyncio.open_connection(host, int(port)), 3.0)
+            writer.write(raw.encode("utf-8"))
+            await writer.drain()
+            await asyncio.wait_for(reader.read(1024), 3.0)
+            writer.close()
+        except (OSError, asyncio.TimeoutError) as e:
+            log.warning("send failed", rate=5, peer=peer, error=e)
+
+    async def _input_loop(self):
+        prompt = f"[Node {self.node_id}] Enter message (blank to skip): "
+        while True:
+            text = await self.loop.run_in_executor(None, input, prompt)
+            if not text.strip():
+                continue
+            message = f"{self.clock.now()}|{text}"
+            payload = self.tx_payload(message)
+
+            print(f"[Node {self.node_id}] Starting 2PC tx={payload['tx_id']}")
+            try:
+                # Direct in-process call: no localhost HTTP hop to our own coordinator
+                result = await self.coord.start(payload)
+            except Exception as e:
+                print(f"[Node {self.node_id}] 2PC failed: {e}")
+                continue
+
+            decision = result.get("decision")
+            print(f"[Node {self.node_id}] 2PC decision for {payload['tx_id']}: {decision}, votes={result.get('votes')}")
+            if decision != "commit":
+                print(f"[Node {self.node_id}] Transaction aborted, not sending message.")
+                continue
+            self.broadcast(message)
+
+    async def _anti_entropy(self):
+        while True:
+            await asyncio.sleep(ANTI_ENTROPY_INTERVAL)
+            self.anti_entropy_round()
+
+    # -----------------------------
+    # Startup
+    # -----------------------------
+    async def main(self):
+        self.loop = asyncio.get_running_loop()
+
+        # Heavy imports happen here, after argument parsing. SELF_URL is left
+        # to the environment, as in the two-process setup: it must match how
+        # the other nodes list this one in PEERS.
+        os.environ.setdefault("NODE_ID", str(self.node_id))
+        import uvicorn
+        from coord import two_phase_commit
+        self.coord = two_phase_commit.NODE
+
+        server = await asyncio.start_server(self._handle_peer, self.host, self.port)
+        log.info(f"Server listening on {self.host}:{self.port}...")
+
+        coord_server = uvicorn.Server(uvicorn.Config(
+            two_phase_commit.app, host=self.coord_host, port=self.coord_port, log_level="warning",
+        ))
+        log.info(f"Coordinator listening on {self.coord_host}:{self.coord_port}...")
+
+        tasks = [server.serve_forever(), coord_server.serve(), self._input_loop()]
+        if self.mode == "gossip":
+            tasks.append(self._anti_entropy())
+        await asyncio.gather(*tasks)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Single-process messaging node")
+    parser.add_argument("node_id")
+    parser.add_argument("peers", nargs="*", help="peer TCP addresses, host:port")
+    parser.add_argument("--coord-host", default="127.0.0.1")
+    parser.add_argument("--coord-port", type=int, default=None)
+    args = parser.parse_args()
+
+    node = NodeRuntime(args.node_id, args.peers, args.coord_host, args.coord_port)
+    asyncio.run(node.main())
+
+
+if __name__ == "__main__":
+    main()
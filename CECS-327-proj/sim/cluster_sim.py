@@ -0,0 +1,365 @@
+"""
+Deterministic in-process cluster simulator.
+
+Runs N nodes -- each a p2p `Node`, a `TwoPhaseNode` coordinator/participant
+and a `TransactionManager` -- in one process over an in-memory network
+with injected latency, drops and partitions. Time is virtual: an asyncio
+loop whose clock jumps straight to the next scheduled event, so a run is
+reproducible from its seed and 100 nodes simulate in seconds.
+
+Usage (from CECS-327-proj):
+    python -m sim.cluster_sim --nodes 100 --txs 1000 --seed 7
+"""
+import argparse
+import asyncio
+import random
+import selectors
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from IPC import async_log
+from IPC.p2p_node import Node
+from IPC.TCPServer import handle_message
+from IPC.transaction_manager import TransactionManager
+from coord.two_phase_node import TwoPhaseNode
+
+
+# -----------------------------
+# Virtual-time event loop
+# -----------------------------
+class _VirtualSelector(selectors.SelectSelector):
+    def __init__(self) -> None:
+        super().__init__()
+        self.now = 0.0
+
+    def select(self, timeout=None):
+        # Nothing ready: jump the clock to the next timer instead of sleeping
+        if timeout is None:
+            raise RuntimeError("simulation stalled: no pending events")
+        self.now += max(timeout, 0.0)
+        return []
+
+
+class SimLoop(asyncio.SelectorEventLoop):
+    def __init__(self) -> None:
+        self._virtual = _VirtualSelector()
+        super().__init__(self._virtual)
+
+    def time(self) -> float:
+        return self._virtual.now
+
+
+# -----------------------------
+# In-memory network
+# -----------------------------
+class SimNetwork:
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        rng: random.Random,
+        latency: Tuple[float, float] = (0.001, 0.005),
+        drop: float = 0.0,
+        timeout: float = 3.0,
+    ) -> None:
+        self.loop = loop
+        self.rng = rng
+        self.latency = latency
+        self.drop = drop
+        self.timeout = timeout
+        self.handlers: Dict[str, Callable[[str, str, Dict[str, Any]], Any]] = {}
+        self._groups: Optional[Dict[str, int]] = None
+        self.sent = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    def register(self, name: str, handler: Callable[[str, str, Any], Any]) -> None:
+        self.handlers[name] = handler
+
+    def partition(self, *groups: List[str]) -> None:
+        self._groups = {name: i for i, group in enumerate(groups) for name in group}
+
+    def heal(self) -> None:
+        self._groups = None
+
+    def _lost(self, src: str, dst: str) -> bool:
+        if self._groups is not None and self._groups.get(src) != self._groups.get(dst):
+            return True
+        return self.drop > 0 and self.rng.random() < self.drop
+
+    def _delay(self) -> float:
+        return self.rng.uniform(*self.latency)
+
+    def post(self, src: str, dst: str, endpoint: str, payload: Any) -> None:
+        """
+        One-way message; delivered after a random latency unless lost.
+        """
+        self.sent += 1
+        if self._lost(src, dst):
+            self.dropped += 1
+            return
+
+        def deliver():
+            self.delivered += 1
+            self.handlers[dst](src, endpoint, payload)
+
+        self.loop.call_later(self._delay(), deliver)
+
+    async def request(self, src: str, dst: str, endpoint: str, payload: Any) -> Any:
+        """
+        Request/response; a lost request or reply surfaces as TimeoutError.
+        """
+        future = self.loop.create_future()
+
+        def fail():
+            if not future.done():
+                future.set_exception(TimeoutError(f"{src}->{dst}{endpoint} timed out"))
+
+        def reply(result, error):
+            self.delivered += 1
+            if future.done():
+                return
+            timer.cancel()
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+        def deliver():
+            self.delivered += 1
+            try:
+                result, error = self.handlers[dst](src, endpoint, payload), None
+            except Exception as e:
+                result, error = None, e
+            self.sent += 1
+            if self._lost(dst, src):
+                self.dropped += 1
+                return
+            self.loop.call_later(self._delay(), reply, result, error)
+
+        self.sent += 1
+        if self._lost(src, dst):
+            self.dropped += 1
+        else:
+            self.loop.call_later(self._delay(), deliver)
+        timer = self.loop.call_later(self.timeout, fail)
+        return await future
+
+
+# -----------------------------
+# Simulated node
+# -----------------------------
+class SimPeer(Node):
+    """
+    p2p Node whose peer sends go over the simulated network instead of TCPClient.
+    """
+
+    def __init__(self, node_id: str, name: str, peers: List[str], network: SimNetwork,
+                 mode: str, fanout: int) -> None:
+        super().__init__(node_id, peers=peers, mode=mode, fanout=fanout)
+        self.name = name
+        self.address = name
+        self.network = network
+        self.rng = random.Random(network.rng.random())
+        # Seeded like everything else, so gossip ids repeat from run to run
+        self._epoch = f"{self.rng.getrandbits(24):06x}"
+        self.received = 0
+        self.originated = 0
+        self.sent = 0
+
+    def send_to_peer(self, peer, message):
+        self.sent += 1
+        self.network.post(self.name, peer, "/message", message)
+
+    def queue_send(self, peer, frame):
+        self.sent += 1
+        self.network.post(self.name, peer, "/message", frame)
+
+    def gossip(self, message):
+        self.originated += 1
+        super().gossip(message)
+
+    def delivered(self) -> int:
+        # Gossip may deliver duplicates; count distinct messages instead
+        if self.mode == "gossip":
+            return len(self.seen) - self.originated
+        return self.received
+
+
+class SimNode:
+    def __init__(self, index: int, names: List[str], network: SimNetwork, args: argparse.Namespace) -> None:
+        self.name = names[index]
+        peers = [n for n in names if n != self.name]
+        self.network = network
+        self.peer = SimPeer(str(index), self.name, peers, network, args.mode, args.fanout)
+        self.tx_manager = TransactionManager(node_id=self.name)
+        self.coord = TwoPhaseNode(
+            self.name,
+            list(names),
+            self._transport,
+            self_url=self.name,
+            replication_factor=args.rf,
+            on_commit=self._apply,
+        )
+        network.register(self.name, self.handle)
+
+    async def _transport(self, peer, endpoint, payload):
+        return await self.network.request(self.name, peer, endpoint, payload)
+
+    def _apply(self, key, value):
+        tx_id = self.tx_manager.begin()
+        self.tx_manager.write(tx_id, key, value)
+        self.tx_manager.commit(tx_id)
+
+    def handle(self, src: str, endpoint: str, payload: Any) -> Any:
+        if endpoint == "/message":
+            self.peer.received += 1
+            return handle_message(self.peer, payload, src)
+        return self.coord.handle(endpoint, payload)
+
+
+# -----------------------------
+# Workload
+# -----------------------------
+class ClusterSim:
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.loop = SimLoop()
+        self.network = SimNetwork(
+            self.loop,
+            self.rng,
+            latency=(args.latency_min / 1000, args.latency_max / 1000),
+            drop=args.drop,
+            timeout=args.timeout,
+        )
+        names = [f"n{i}" for i in range(args.nodes)]
+        self.nodes = [SimNode(i, names, self.network, args) for i in range(args.nodes)]
+        self.latencies: List[float] = []
+        self.commits = 0
+        self.aborts = 0
+        self.workload_seconds = 0.0
+        self.done = False
+
+    async def one_tx(self, seq: int, at: float) -> None:
+        await asyncio.sleep(at - self.loop.time())
+        node = self.rng.choice(self.nodes)
+        key = f"k{self.rng.randrange(self.args.keys)}"
+        message = f"{node.peer.clock.now()}|msg {seq} from {node.name}"
+
+        start = self.loop.time()
+        result = await node.coord.start({"tx_id": f"{node.name}-{seq}", "key": key, "value": message})
+        self.latencies.append(self.loop.time() - start)
+
+        if result["decision"] == "commit":
+            self.commits += 1
+            node.peer.broadcast(message)
+        else:
+            self.aborts += 1
+
+    async def partition_schedule(self) -> None:
+        at, duration = self.args.partition
+        await asyncio.sleep(at)
+        names = [n.name for n in self.nodes]
+        half = len(names) // 2
+        self.network.partition(names[:half], names[half:])
+        await asyncio.sleep(duration)
+        self.network.heal()
+
+    async def anti_entropy(self) -> None:
+        while not self.done:
+            await asyncio.sleep(self.args.anti_entropy)
+            for node in self.nodes:
+                node.peer.anti_entropy_round()
+
+    async def run(self) -> None:
+        tasks = []
+        at = 0.0
+        for seq in range(self.args.txs):
+            at += self.rng.expovariate(self.args.rate)
+            tasks.append(asyncio.ensure_future(self.one_tx(seq, at)))
+        if self.args.partition:
+            tasks.append(asyncio.ensure_future(self.partition_schedule()))
+        repair = None
+        if self.args.mode == "gossip" and self.args.anti_entropy > 0:
+            repair = asyncio.ensure_future(self.anti_entropy())
+        await asyncio.gather(*tasks)
+        self.workload_seconds = self.loop.time()
+        # Let in-flight chat messages (and a few repair rounds) land
+        await asyncio.sleep(self.args.latency_max / 1000 + self.args.timeout)
+        self.done = True
+        if repair is not None:
+            await repair
+
+    def execute(self) -> Dict[str, Any]:
+        wall_start = time.perf_counter()
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self.run())
+        finally:
+            self.loop.close()
+            asyncio.set_event_loop(None)
+
+        virtual = self.workload_seconds
+        total = self.commits + self.aborts
+        latencies = sorted(self.latencies)
+        return {
+            "nodes": self.args.nodes,
+            "txs": total,
+            "commits": self.commits,
+            "abort_rate": self.aborts / total if total else 0.0,
+            "2pc_p50_ms": _percentile(latencies, 0.50) * 1000,
+            "2pc_p99_ms": _percentile(latencies, 0.99) * 1000,
+            "messages_sent": self.network.sent,
+            "messages_dropped": self.network.dropped,
+            "messages_per_sec": self.network.delivered / virtual if virtual else 0.0,
+            "chat_coverage": (
+                sum(n.peer.delivered() for n in self.nodes) / (self.commits * (len(self.nodes) - 1))
+                if self.commits and len(self.nodes) > 1 else 0.0
+            ),
+            "max_node_sends": max(n.peer.sent for n in self.nodes),
+            "virtual_seconds": virtual,
+            "wall_seconds": time.perf_counter() - wall_start,
+        }
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Deterministic 2PC / p2p cluster simulator")
+    parser.add_argument("--nodes", type=int, default=20)
+    parser.add_argument("--txs", type=int, default=500)
+    parser.add_argument("--rate", type=float, default=200.0, help="transactions per virtual second")
+    parser.add_argument("--keys", type=int, default=100, help="key space size (smaller = more contention)")
+    parser.add_argument("--rf", type=int, default=3, help="replication factor")
+    parser.add_argument("--latency-min", type=float, default=1.0, help="ms")
+    parser.add_argument("--latency-max", type=float, default=5.0, help="ms")
+    parser.add_argument("--drop", type=float, default=0.0, help="per-message drop probability")
+    parser.add_argument("--timeout", type=float, default=3.0, help="request timeout, virtual seconds")
+    parser.add_argument(
+        "--partition", type=lambda s: tuple(float(x) for x in s.split(":")), default=None,
+        metavar="AT:DURATION", help="split the cluster in half at AT for DURATION virtual seconds",
+    )
+    parser.add_argument("--mode", choices=("mesh", "gossip"), default="mesh", help="p2p dissemination mode")
+    parser.add_argument("--fanout", type=int, default=3, help="gossip fanout")
+    parser.add_argument("--anti-entropy", type=float, default=1.0, help="gossip digest interval, virtual seconds")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", action="store_true", help="keep per-message node logging")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> None:
+    args = parse_args(argv)
+    if not args.verbose:
+        async_log.LOG_LEVEL = async_log.WARNING
+
+    result = ClusterSim(args).execute()
+    for name, value in result.items():
+        print(f"{name:>18}: {value:.3f}" if isinstance(value, float) else f"{name:>18}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# Tests import the project packages the same way the API does (IPC.*, coord.*)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,30 @@
+import pytest
+
+from sim.cluster_sim import ClusterSim, parse_args
+
+
+def run(*argv):
+    result = ClusterSim(parse_args(list(argv))).execute()
+    # The only field that depends on the machine
+    result.pop("wall_seconds")
+    return result
+
+
+@pytest.mark.parametrize("mode", ["mesh", "gossip"])
+def test_same_seed_same_result(mode):
+    argv = ("--nodes", "8", "--txs", "60", "--drop", "0.05", "--partition", "0.1:0.5",
+            "--mode", mode, "--fanout", "2", "--seed", "4")
+    first = run(*argv)
+    assert first["messages_dropped"] > 0
+    assert run(*argv) == first
+
+
+def test_gossip_repairs_what_mesh_loses():
+    # Enough messages that a digest of only the most recent ids would leave
+    # older losses unrepaired
+    argv = ("--nodes", "30", "--txs", "200", "--drop", "0.02", "--fanout", "2", "--seed", "1")
+    mesh = run(*argv, "--mode", "mesh")
+    gossip = run(*argv, "--mode", "gossip")
+
+    assert mesh["chat_coverage"] < 1.0
+    assert gossip["chat_coverage"] == 1.0
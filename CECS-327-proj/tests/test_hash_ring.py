@@ -0,0 +1,57 @@
+import pytest
+
+from coord.hash_ring import HashRing, moved_keys
+
+KEYS = [f"key-{i}" for i in range(2000)]
+
+
+def nodes(n):
+    return [f"http://10.0.0.{i}:8000" for i in range(1, n + 1)]
+
+
+def test_owners_are_distinct_and_capped_by_cluster_size():
+    ring = HashRing(nodes(5), replication_factor=3)
+    for key in KEYS[:100]:
+        owners = ring.owners(key)
+        assert len(owners) == len(set(owners)) == 3
+
+    small = HashRing(nodes(2), replication_factor=3)
+    assert sorted(small.owners("k")) == nodes(2)
+
+
+@pytest.mark.parametrize("rf", [1, 3])
+def test_join_only_moves_keys_to_the_new_node(rf):
+    old = HashRing(nodes(10), replication_factor=rf)
+    new = old.copy()
+    new.add_node("http://10.0.0.11:8000")
+
+    moves = moved_keys(old, new, KEYS)
+    for key, (gained, lost) in moves.items():
+        assert gained == ["http://10.0.0.11:8000"]
+        assert len(lost) == 1
+    for key in set(KEYS) - set(moves):
+        assert old.owners(key) == new.owners(key)
+
+    # Roughly rf/11 of the keys should gain the new node
+    assert 0.5 * rf / 11 < len(moves) / len(KEYS) < 1.5 * rf / 11
+
+
+@pytest.mark.parametrize("rf", [1, 3])
+def test_leave_only_moves_keys_off_the_leaving_node(rf):
+    old = HashRing(nodes(10), replication_factor=rf)
+    new = old.copy()
+    new.remove_node("http://10.0.0.4:8000")
+
+    moves = moved_keys(old, new, KEYS)
+    assert set(moves) == {k for k in KEYS if "http://10.0.0.4:8000" in old.owners(k)}
+    for key, (gained, lost) in moves.items():
+        assert lost == ["http://10.0.0.4:8000"]
+        assert len(gained) == 1
+
+
+def test_join_then_leave_restores_ownership():
+    ring = HashRing(nodes(6), replication_factor=2)
+    before = {k: ring.owners(k) for k in KEYS}
+    ring.add_node("http://10.0.0.7:8000")
+    ring.remove_node("http://10.0.0.7:8000")
+    assert {k: ring.owners(k) for k in KEYS} == before
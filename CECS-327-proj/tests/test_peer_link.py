@@ -0,0 +1,166 @@
+import asyncio
+import socket
+import threading
+import zlib
+
+from IPC.peer_link import LINK_MAGIC, PeerLink, _decode_batch, serve_link, serve_link_async
+
+
+class LinkServer:
+    """
+    Accepts link connections the way TCPServer does and records every
+    message handed to it.
+    """
+
+    def __init__(self):
+        self.received = []
+        self.wrap = lambda conn: conn
+        self.sock = socket.create_server(("127.0.0.1", 0))
+        self.address = self.sock.getsockname()
+        threading.Thread(target=self._accept, daemon=True).start()
+
+    def _accept(self):
+        while True:
+            try:
+                conn, _ = self.sock.accept()
+            except OSError:
+                return
+            data = conn.recv(1024)
+            assert data.startswith(LINK_MAGIC)
+            threading.Thread(
+                target=serve_link, args=(self.wrap(conn), data[len(LINK_MAGIC):], self.received.append), daemon=True
+            ).start()
+
+    def close(self):
+        self.sock.close()
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def test_burst_is_coalesced_and_acked():
+    server = LinkServer()
+    link = PeerLink(server.address, window=0.05)
+    messages = [f"{i}|message {i}" for i in range(500)]
+    for message in messages:
+        link.send(message)
+    assert link.flush()
+
+    assert server.received == messages
+    assert link.messages == 500
+    assert link.batches < 10
+    assert link.dropped == 0
+    server.close()
+
+
+def test_cumulative_ack_across_batches():
+    server = LinkServer()
+    link = PeerLink(server.address, window=0.0)
+    for i in range(5):
+        link.send(f"{i}|batch {i}")
+        assert link.flush()
+
+    assert link.batches == 5
+    # One connection, each ack is the last seq handled on the link
+    assert link._acked == 5
+    assert len(server.received) == 5
+    server.close()
+
+
+class LostAck:
+    """
+    Connection whose first ack never reaches the sender: the batch is
+    handled, then the connection drops.
+    """
+
+    lost = False
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.conn.close()
+
+    def recv(self, n):
+        return self.conn.recv(n)
+
+    def sendall(self, data):
+        if not LostAck.lost:
+            LostAck.lost = True
+            self.conn.shutdown(socket.SHUT_RDWR)
+            return
+        self.conn.sendall(data)
+
+
+def test_retry_after_lost_ack_is_not_delivered_twice():
+    server = LinkServer()
+    server.wrap = LostAck
+    link = PeerLink(server.address, window=0.05)
+    messages = [f"{i}|retried {i}" for i in range(20)]
+    for message in messages:
+        link.send(message)
+    assert link.flush()
+
+    # The batch went out twice, but each message was handled once
+    assert LostAck.lost
+    assert server.received == messages
+    assert link.dropped == 0
+
+    link.send("20|after retry")
+    assert link.flush()
+    assert server.received == messages + ["20|after retry"]
+    server.close()
+
+
+def test_large_batches_are_compressed():
+    server = LinkServer()
+    link = PeerLink(server.address, window=0.05, compress_threshold=100)
+    messages = [f"{i}|" + "x" * 200 for i in range(50)]
+    for message in messages:
+        link.send(message)
+    assert link.flush()
+    assert server.received == messages
+
+    body = zlib.compress(b'["1|a","2|b"]')
+    assert _decode_batch(0x01, body) == ["1|a", "2|b"]
+    assert _decode_batch(0x00, b'["1|a"]') == ["1|a"]
+    server.close()
+
+
+def test_dead_peer_drops_without_raising():
+    link = PeerLink(("127.0.0.1", free_port()), window=0.0)
+    link.send("1|first message")
+    assert link.flush()
+    assert link.dropped == 1
+
+    # Later sends are still queued (and dropped), never raised to the caller
+    link.send("2|second message")
+    assert link.flush()
+    assert link.dropped == 2
+
+
+def test_async_server_round_trip():
+    received = []
+
+    async def main():
+        async def handle(reader, writer):
+            data = await reader.read(1024)
+            await serve_link_async(reader, writer, data[len(LINK_MAGIC):], received.append)
+
+        server = await asyncio.start_server(handle, "127.0.0.1", 0)
+        link = PeerLink(server.sockets[0].getsockname()[:2], window=0.01, compress_threshold=10)
+        for i in range(100):
+            link.send(f"{i}|async {i}")
+        assert await asyncio.get_running_loop().run_in_executor(None, link.flush)
+        server.close()
+        return link
+
+    link = asyncio.run(main())
+    assert received == [f"{i}|async {i}" for i in range(100)]
+    assert link.dropped == 0
@@ -0,0 +1,131 @@
+import threading
+import time
+
+import pytest
+
+from IPC.transaction_manager import TransactionManager
+from IPC.reservation_manager import ReservationManager, ReservationConflict
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class SlowTransactionManager(TransactionManager):
+    """
+    Runs `hook` once, inside the next call to `pause_in`, before the real
+    write/commit happens.
+    """
+
+    def __init__(self):
+        super().__init__(node_id="test")
+        self.pause_in = None
+        self.hook = None
+
+    def _maybe_pause(self, method):
+        if self.pause_in == method and self.hook is not None:
+            hook, self.hook = self.hook, None
+            hook()
+
+    def write(self, tx_id, key, value):
+        self._maybe_pause("write")
+        return super().write(tx_id, key, value)
+
+    def commit(self, tx_id):
+        self._maybe_pause("commit")
+        return super().commit(tx_id)
+
+
+def make_manager(tm=None, **kwargs):
+    clock = kwargs.pop("clock", FakeClock())
+    tm = tm or TransactionManager(node_id="test")
+    return tm, clock, ReservationManager(tm, stations=["s1", "s2"], clock=clock, **kwargs)
+
+
+@pytest.mark.parametrize("pause_in", ["write", "commit"])
+def test_release_and_rereserve_keep_store_in_order(pause_in):
+    tm = SlowTransactionManager()
+    _, _, rm = make_manager(tm)
+    lease = rm.reserve("s1", "A")
+    errors = []
+
+    def reserve_b():
+        try:
+            rm.reserve("s1", "B")
+        except Exception as e:
+            errors.append(e)
+
+    reserver = threading.Thread(target=reserve_b)
+
+    def reserve_while_release_is_slow():
+        # The release already freed the bit; vehicle B grabs the station
+        # while the release's store write is still pending.
+        reserver.start()
+        time.sleep(0.2)
+
+    tm.pause_in = pause_in
+    tm.hook = reserve_while_release_is_slow
+    rm.release(lease.lease_id)
+    reserver.join(5)
+
+    assert errors == []
+    assert rm.available(["s1"]) == []
+    assert tm.dump_store()["station:s1"] == "B"
+
+
+def test_reserve_conflict_and_release_frees_station():
+    tm, _, rm = make_manager()
+    lease = rm.reserve("s1", "A")
+    with pytest.raises(ReservationConflict):
+        rm.reserve("s1", "B")
+    assert tm.dump_store()["station:s1"] == "A"
+
+    rm.release(lease.lease_id)
+    assert "s1" in rm.available()
+    assert tm.dump_store()["station:s1"] is None
+
+
+def test_lease_past_one_wheel_rotation_expires_on_time():
+    tm, clock, rm = make_manager(tick=1.0, wheel_size=8)
+    lease = rm.reserve("s1", "A", ttl=20)
+
+    clock.now += 19.5
+    assert rm.expire_due() == []
+    assert rm.get_lease(lease.lease_id) is lease
+
+    clock.now += 0.5
+    assert rm.expire_due() == [lease]
+    assert rm.available(["s1"]) == ["s1"]
+    assert tm.dump_store()["station:s1"] is None
+
+
+def test_renew_past_one_wheel_rotation():
+    _, clock, rm = make_manager(tick=1.0, wheel_size=8)
+    lease = rm.reserve("s1", "A", ttl=5)
+
+    clock.now += 4
+    assert rm.expire_due() == []
+    rm.renew(lease.lease_id, ttl=20)
+
+    clock.now += 19
+    assert rm.expire_due() == []
+    clock.now += 1
+    assert rm.expire_due() == [lease]
+    with pytest.raises(KeyError):
+        rm.renew(lease.lease_id)
+
+
+def test_ttl_must_be_positive():
+    _, clock, rm = make_manager(default_ttl=300)
+    with pytest.raises(ValueError):
+        rm.reserve("s1", "A", ttl=0)
+    with pytest.raises(ValueError):
+        rm.reserve_any("A", ttl=-5)
+    assert rm.available() == ["s1", "s2"]
+
+    lease = rm.reserve("s1", "A")
+    assert lease.expires_at == clock.now + 300
@@ -0,0 +1,123 @@
+import asyncio
+
+import pytest
+
+from coord.two_phase_node import TwoPhaseNode
+
+URLS = [f"http://10.0.0.{i}:8000" for i in range(1, 6)]
+
+
+def cluster(rf, named=True):
+    """
+    Five nodes whose peers list only the others, wired through an
+    in-memory transport.
+    """
+    nodes = {}
+
+    async def transport(peer, endpoint, payload):
+        return nodes[peer].handle(endpoint, payload)
+
+    for i, url in enumerate(URLS):
+        peers = [u for u in URLS if u != url]
+        nodes[url] = TwoPhaseNode(
+            str(i + 1), peers, transport, self_url=url if named else "", replication_factor=rf
+        )
+    return nodes
+
+
+def test_every_node_builds_the_same_ring():
+    nodes = cluster(rf=2)
+    for key in ["messages"] + [f"k{i}" for i in range(200)]:
+        assert len({tuple(sorted(n.ring.owners(key))) for n in nodes.values()}) == 1
+
+
+def test_commit_lands_on_owners_only():
+    nodes = cluster(rf=2)
+    coordinator = nodes[URLS[0]]
+    result = asyncio.run(coordinator.start({"tx_id": "1-1", "key": "messages", "value": "hi"}))
+
+    assert result["decision"] == "commit"
+    owners = set(coordinator.ring.owners("messages"))
+    assert {url for url, n in nodes.items() if n.store.get("messages") == "hi"} == owners
+
+
+def test_self_url_required_below_cluster_size():
+    with pytest.raises(ValueError, match="SELF_URL"):
+        cluster(rf=2, named=False)
+
+
+def test_unnamed_node_with_full_replication_stores_locally():
+    nodes = {}
+
+    async def transport(peer, endpoint, payload):
+        return nodes[peer].handle(endpoint, payload)
+
+    nodes.update({url: TwoPhaseNode(str(i), [], transport, self_url=url) for i, url in enumerate(URLS[1:])})
+    local = TwoPhaseNode("1", URLS[1:], transport, replication_factor=5)
+    result = asyncio.run(local.start({"tx_id": "1-1", "key": "messages", "value": "hi"}))
+
+    assert result["decision"] == "commit"
+    assert local.store["messages"] == "hi"
+    assert all(n.store["messages"] == "hi" for n in nodes.values())
+
+    with pytest.raises(ValueError, match="SELF_URL"):
+        asyncio.run(local.change_membership("http://10.0.0.6:8000", join=True, propagate=False))
+
+
+def test_full_replication_without_self_url_by_default():
+    nodes = {}
+
+    async def transport(peer, endpoint, payload):
+        return nodes[peer].handle(endpoint, payload)
+
+    nodes.update({url: TwoPhaseNode(str(i), [], transport, self_url=url) for i, url in enumerate(URLS[1:4])})
+    local = TwoPhaseNode("1", URLS[1:4], transport)
+    assert local.ring.replication_factor == 4
+
+    result = asyncio.run(local.start({"tx_id": "1-1", "key": "messages", "value": "hi"}))
+    assert result["decision"] == "commit"
+    assert local.store["messages"] == "hi"
+    assert all(n.store["messages"] == "hi" for n in nodes.values())
+
+    # Still every node after a join
+    asyncio.run(local.change_membership(URLS[4], join=True, propagate=False))
+    assert local.ring.replication_factor == 5
+
+
+def test_key_is_kept_until_a_new_owner_acknowledges_it(monkeypatch):
+    monkeypatch.setattr("coord.two_phase_node.HANDOFF_BACKOFF", 0)
+    nodes = {}
+    down = set()
+
+    async def transport(peer, endpoint, payload):
+        if peer in down:
+            raise ConnectionError(f"{peer} unreachable")
+        return nodes[peer].handle(endpoint, payload)
+
+    for i, url in enumerate(URLS[:4]):
+        nodes[url] = TwoPhaseNode(str(i), [u for u in URLS[:4] if u != url], transport,
+                                  self_url=url, replication_factor=1)
+    newcomer = TwoPhaseNode("4", URLS[:4], transport, self_url=URLS[4], replication_factor=1)
+
+    # Keys that will move to the newcomer, stored on their current single owner
+    moving = [k for k in (f"k{i}" for i in range(500)) if newcomer.ring.owners(k) == [URLS[4]]][:5]
+    assert moving
+    for key in moving:
+        nodes[nodes[URLS[0]].ring.owners(key)[0]].store[key] = "v"
+
+    nodes[URLS[4]] = newcomer
+    down.add(URLS[4])
+    for node in list(nodes.values())[:4]:
+        asyncio.run(node.change_membership(URLS[4], join=True, propagate=False))
+
+    # Handoff failed: nothing is lost
+    holders = [n for n in list(nodes.values())[:4] if any(k in n.store for k in moving)]
+    assert sorted(k for n in holders for k in n.store) == sorted(moving)
+    assert sorted(k for n in holders for k in n.pending_handoff) == sorted(moving)
+
+    down.clear()
+    for node in holders:
+        asyncio.run(node.rebalance(node.ring.copy()))
+        assert node.pending_handoff == set()
+    assert sorted(newcomer.store) == sorted(moving)
+    assert not any(k in n.store for n in holders for k in moving)
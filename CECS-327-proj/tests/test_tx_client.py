@@ -0,0 +1,131 @@
+import threading
+import zlib
+
+import pytest
+
+from IPC.tx_client import RemoteTransactionManager, RemoteReservationManager
+from IPC.tx_service import TxServer, TxService, start_ts_of
+
+
+@pytest.fixture
+def services():
+    servers = []
+    for i in range(2):
+        server = TxServer(("127.0.0.1", 0), TxService(f"txm-{i}"))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+    yield servers
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+        server.service.reservations.stop()
+
+
+@pytest.fixture
+def tm(services):
+    client = RemoteTransactionManager([f"127.0.0.1:{s.server_address[1]}" for s in services])
+    yield client
+    client.close()
+
+
+def partition(key):
+    return zlib.crc32(key.encode("utf-8")) % 2
+
+
+def test_keys_are_partitioned_by_crc32(services, tm):
+    keys = [f"k{i}" for i in range(20)]
+    assert {partition(k) for k in keys} == {0, 1}
+
+    tx = tm.begin()
+    for key in keys:
+        tm.write(tx, key, key.upper())
+    tm.commit(tx)
+
+    for i, server in enumerate(services):
+        store = server.service.tx_manager.dump_store()
+        assert sorted(store) == sorted(k for k in keys if partition(k) == i)
+
+    tx = tm.begin()
+    assert [tm.read(tx, k) for k in keys] == [k.upper() for k in keys]
+    tm.commit(tx)
+    assert tm.dump_store() == {k: k.upper() for k in keys}
+
+
+def test_station_records_are_read_from_the_reservation_service(services, tm):
+    station = next(f"s{i}" for i in range(100) if partition(f"station:s{i}") == 1)
+    reservations = RemoteReservationManager(tm)
+    lease = reservations.reserve(station, "vehicle-1", 60)
+
+    tx = tm.begin()
+    assert tm.read(tx, f"station:{station}") == "vehicle-1"
+    tm.commit(tx)
+
+    reservations.release(lease.lease_id)
+    tx = tm.begin()
+    assert tm.read(tx, f"station:{station}") is None
+    tm.commit(tx)
+
+
+def test_unknown_transaction_is_a_key_error(tm):
+    key = next(f"k{i}" for i in range(100) if partition(f"k{i}") == 1)
+    with pytest.raises(KeyError):
+        start_ts_of("not-a-tx")
+    with pytest.raises(KeyError, match="Unknown transaction"):
+        tm.read("bogus", key)
+
+
+def test_metrics_come_from_every_service(services, tm):
+    tx = tm.begin()
+    tm.write(tx, "k0", "v")
+    tm.commit(tx)
+
+    snapshots = tm.metrics()
+    assert sorted(snapshots) == sorted(f"127.0.0.1:{s.server_address[1]}" for s in services)
+    assert sum(s["metrics"].get("tx_commits_total", 0) for s in snapshots.values()) >= 1
+
+
+def test_late_write_and_repeated_commit_keep_committed_values(services, tm):
+    a = next(f"k{i}" for i in range(100) if partition(f"k{i}") == 0)
+    b = next(f"k{i}" for i in range(100) if partition(f"k{i}") == 1)
+
+    tx = tm.begin()
+    tm.write(tx, a, "old")
+    tm.write(tx, b, "v1")
+    tm.commit(tx)
+
+    tx = tm.begin()
+    tm.write(tx, a, "new")
+    tm.write(tx, b, "v2")
+    tm.commit(tx)
+
+    # Retried commit and a write after commit both fail without rolling back
+    with pytest.raises(RuntimeError):
+        tm.commit(tx)
+    with pytest.raises(RuntimeError):
+        tm.write(tx, a, "late")
+    with pytest.raises(RuntimeError, match="COMMITTED"):
+        tm.abort(tx)
+    assert tm.dump_store() == {a: "new", b: "v2"}
+
+
+def test_timed_out_lock_wait_releases_the_lock(services):
+    addresses = [f"127.0.0.1:{s.server_address[1]}" for s in services]
+    slow = RemoteTransactionManager(addresses, timeout=0.3)
+    tm = RemoteTransactionManager(addresses)
+
+    older = tm.begin()
+    younger = tm.begin()
+    tm.write(younger, "k0", "younger")
+
+    # The older transaction waits for the lock (wait-die) until the client times out
+    with pytest.raises(OSError):
+        slow.write(older, "k0", "older")
+    assert tm.get_status(older).name == "ABORTED"
+
+    tm.commit(younger)
+    tx = tm.begin()
+    tm.write(tx, "k0", "after")
+    tm.commit(tx)
+    assert tm.dump_store()["k0"] == "after"
+    slow.close()
+    tm.close()